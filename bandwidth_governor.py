@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import multiprocessing
+import re
+import threading
+import time
+from typing import Optional, Tuple
+
+
+_RATE_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([kmgt]?)i?b?(?:/s)?\s*$", re.IGNORECASE)
+_RATE_UNITS = {"": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3, "t": 1024 ** 4}
+
+# Slots of the shared state array
+_RATE, _TOKENS, _LAST_REFILL, _ACTIVE = range(4)
+
+
+def parse_rate(text: Optional[str]) -> Optional[float]:
+    """Parse a yt-dlp style rate such as ``500K``, ``5M`` or ``1.5MiB/s`` into bytes per second"""
+    if not text:
+        return None
+    match = _RATE_RE.match(str(text))
+    if not match:
+        return None
+    value = float(match.group(1)) * _RATE_UNITS[match.group(2).lower()]
+    return value or None
+
+
+class BandwidthGovernor:
+    """Token bucket that caps the combined download speed of every worker.
+
+    The bucket lives in shared memory, so download threads in this process and
+    pooled download processes that received the governor at start-up all draw
+    from the same budget. Each download also gets an equal share of the rate
+    while others are active, so one fast connection cannot starve the rest.
+    """
+
+    def __init__(self, rate: Optional[float] = None, burst_seconds: float = 0.5) -> None:
+        context = multiprocessing.get_context("spawn")
+        self._lock = context.Lock()
+        self._state = context.RawArray("d", 4)
+        self._burst_seconds = burst_seconds
+        self._state[_LAST_REFILL] = time.monotonic()
+        self.set_rate(rate)
+
+    @property
+    def rate(self) -> Optional[float]:
+        return self._state[_RATE] or None
+
+    def set_rate(self, rate: Optional[float]) -> None:
+        """Set the total cap in bytes per second; ``None`` or 0 removes it"""
+        with self._lock:
+            self._state[_RATE] = float(rate or 0)
+            self._state[_TOKENS] = 0.0
+            self._state[_LAST_REFILL] = time.monotonic()
+
+    def consumer(self) -> BandwidthConsumer:
+        return BandwidthConsumer(self)
+
+    def _register(self, delta: int) -> None:
+        with self._lock:
+            self._state[_ACTIVE] = max(0.0, self._state[_ACTIVE] + delta)
+
+    def _reserve(self, nbytes: int) -> Tuple[float, float]:
+        """Debit ``nbytes`` from the bucket; returns (seconds to wait, fair per-download rate)"""
+        with self._lock:
+            rate = self._state[_RATE]
+            if rate <= 0:
+                return 0.0, 0.0
+            now = time.monotonic()
+            burst = max(rate * self._burst_seconds, 64 * 1024)
+            tokens = min(burst, self._state[_TOKENS] + (now - self._state[_LAST_REFILL]) * rate)
+            tokens -= nbytes
+            self._state[_TOKENS] = tokens
+            self._state[_LAST_REFILL] = now
+            share = rate / max(1.0, self._state[_ACTIVE])
+        return (-tokens / rate if tokens < 0 else 0.0), share
+
+
+class BandwidthConsumer:
+    """One download's handle on a BandwidthGovernor; use as a context manager around the transfer."""
+
+    def __init__(self, governor: BandwidthGovernor) -> None:
+        self._governor = governor
+        self._lock = threading.Lock()
+        self._next_allowed = time.monotonic()
+
+    def __enter__(self) -> BandwidthConsumer:
+        self._governor._register(1)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._governor._register(-1)
+
+    def consume(self, nbytes: int) -> None:
+        """Account for ``nbytes`` just received, sleeping long enough to stay within the caps"""
+        if nbytes <= 0:
+            return
+        wait, share = self._governor._reserve(nbytes)
+        if share > 0:
+            with self._lock:
+                now = time.monotonic()
+                self._next_allowed = max(self._next_allowed, now) + nbytes / share
+                ahead = self._next_allowed - now - self._governor._burst_seconds
+            # Downloads within their fair share go on; the ones above it pay off the shared debt
+            wait = max(wait, ahead) if ahead > 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+
+_default_governor: Optional[BandwidthGovernor] = None
+
+
+def default_governor() -> BandwidthGovernor:
+    """The governor shared by every download started from this process"""
+    global _default_governor
+    if _default_governor is None:
+        _default_governor = BandwidthGovernor()
+    return _default_governor
@@ -0,0 +1,496 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from yt_dlp.utils import DownloadCancelled
+
+from bandwidth_governor import BandwidthGovernor, default_governor
+from disk_space import DISK_RECHECK_SECONDS, DiskSpaceLedger, estimate_download_size, output_dir_for
+from download_engine import POSTPROCESS_WORKERS, DownloadJob, create_postprocess_slots
+from download_progress import DownloadProgress
+from fragment_tuner import FragmentTuner, TuningSample
+from metadata_prefetcher import MetadataPrefetcher
+from process_pool import DownloadProcessPool, PooledJob
+from queue_manager import INTERACTIVE_SLOTS, PRIORITY_HIGH, QueueManager, DownloadItem, DownloadStatus
+from retry_engine import ERROR_LABELS, RetryEngine, classify_error
+
+# Execution backends for downloads
+BACKEND_THREAD = "thread"
+BACKEND_PROCESS = "process"
+
+Job = Union[DownloadJob, PooledJob]
+
+
+class BatchRunner:
+    """Runs the QueueManager work queue on concurrent download slots, without Qt.
+
+    The scheduling core shared by the window (through DownloadScheduler),
+    the command line and the daemon: download slots plus interactive ones,
+    per-playlist limits and progress, the shared bandwidth governor, bounded
+    post-processing, retries with backoff, fragment auto-tuning, metadata
+    prefetch and disk space admission. Jobs run on threads, or in pooled
+    processes with the process backend.
+
+    Queue state belongs to one owner thread: the one in ``run``, or the
+    thread that created the runner when an event loop drives it through
+    ``post`` and ``on_wakeup`` instead. Public methods called on the owner
+    thread act immediately; from other threads they are posted to it.
+    ``post(event)`` delivers events from job threads to the owner thread,
+    which passes them to ``dispatch``; ``on_wakeup(epoch)`` asks for a
+    ``pump`` at that time (None cancels it).
+
+    ``on_event(kind, item, data)`` is called on the owner thread with kind
+    "queued", "duplicate" (not queued: the same video is already queued or
+    running), "started", "progress" (DownloadProgress), "resumed" (bytes), "processing",
+    "retrying" (seconds until the retry), "deferred" (bytes missing on the output
+    volume), "batch" ((finished, total, percent) of the item's playlist) or
+    "finished" ((ok, message)).
+    """
+
+    def __init__(
+        self,
+        queue_manager: QueueManager,
+        max_concurrent: int = 3,
+        on_event: Optional[Callable[[str, DownloadItem, Any], None]] = None,
+        governor: Optional[BandwidthGovernor] = None,
+        backend: str = BACKEND_THREAD,
+        post: Optional[Callable[[tuple], None]] = None,
+        on_wakeup: Optional[Callable[[Optional[float]], None]] = None,
+    ) -> None:
+        self.queue_manager = queue_manager
+        self._max_concurrent = max(1, int(max_concurrent))
+        self._on_event = on_event or (lambda kind, item, data: None)
+        self._governor = governor or default_governor()
+        self._backend = backend
+        self._process_pool: Optional[DownloadProcessPool] = None
+        self._postprocess_slots = create_postprocess_slots()
+        # Picks concurrent_fragment_downloads for items whose options leave it unset (auto mode)
+        self._fragment_tuner = FragmentTuner(queue_manager.data_dir / "fragment_tuning.json")
+        self._tuning: Dict[str, TuningSample] = {}
+        self._retry_engine = RetryEngine()
+        # Extracts the next queued items while the current ones download
+        self._prefetcher = MetadataPrefetcher()
+        # Reserves the estimated size of running items against free disk space
+        self._disk = DiskSpaceLedger()
+        self._disk_deferred: Dict[str, int] = {}  # item id -> bytes missing when last checked
+        # Max simultaneous downloads per playlist/channel batch (0 = only the global limit)
+        self._batch_limit = 0
+        self._batches: Dict[str, Dict[str, Any]] = {}
+        self._events: "queue.Queue[tuple]" = queue.Queue()
+        self._post_event = post or self._events.put
+        self._on_wakeup = on_wakeup or (lambda at: None)
+        self._owner = threading.get_ident()
+        self._active: Dict[str, DownloadItem] = {}
+        # Transferred items that wait for or run post-processing; they no longer hold a download slot
+        self._processing: Dict[str, DownloadItem] = {}
+        self._jobs: Dict[str, Job] = {}
+        self._threads: Dict[str, threading.Thread] = {}
+        self._stopped = threading.Event()
+        # When the earliest delayed retry becomes due; refreshed by every pump
+        self._wakeup_at: Optional[float] = None
+
+    @property
+    def max_concurrent(self) -> int:
+        return self._max_concurrent
+
+    # --- Requests ---
+
+    def submit(self, item: DownloadItem, info: Optional[Dict[str, Any]] = None) -> None:
+        """Queue a download item; ``info`` is its already extracted info dict, if any"""
+        self._call(self._submit, [item], info)
+
+    def submit_many(self, items: List[DownloadItem]) -> None:
+        """Queue several items at once, e.g. the entries of a playlist"""
+        self._call(self._submit, items, None)
+
+    def resume(self) -> int:
+        """Start items left in the persistent queue by a previous session; returns how many wait"""
+        self._call(self._resume)
+        return len(self.queue_manager.get_pending())
+
+    def cancel(self, item_id: str) -> None:
+        """Cancel a running or queued item"""
+        self._call(self._cancel, item_id)
+
+    def cancel_all(self) -> None:
+        """Cancel every queued item first, then the running ones"""
+        self._call(self._cancel_all)
+
+    def set_priority(self, item_id: str, priority: int) -> None:
+        """Reorder a queued item"""
+        self._call(self._set_priority, item_id, priority)
+
+    def set_max_concurrent(self, value: int) -> None:
+        """Change the number of download slots; extra slots are filled immediately"""
+        self._call(self._set_max_concurrent, value)
+
+    def set_batch_limit(self, value: int) -> None:
+        """Cap how many entries of one playlist run at once, leaving slots for other downloads"""
+        self._call(self._set_batch_limit, value)
+
+    def set_speed_limit(self, rate: Optional[float]) -> None:
+        """Cap the combined speed of all downloads in bytes per second (None for unlimited)"""
+        self._governor.set_rate(rate)
+
+    def set_backend(self, backend: str) -> None:
+        """Choose where new downloads run: threads or pooled worker processes"""
+        self._backend = backend
+
+    def stop(self) -> None:
+        """Make ``run`` return; running downloads are interrupted and stay queued"""
+        self._stopped.set()
+        self._post("call", lambda: None)
+
+    def _call(self, fn: Callable[..., None], *args: Any) -> None:
+        """Run ``fn`` now on the owner thread, or post it there from any other thread"""
+        if threading.get_ident() == self._owner:
+            fn(*args)
+        else:
+            self._post("call", fn, *args)
+
+    def _post(self, *event: Any) -> None:
+        self._post_event(event)
+
+    # --- Run loop ---
+
+    def run(self, until_idle: bool = True) -> None:
+        """Process the queue until it drains (or, without ``until_idle``, until ``stop``)"""
+        self._owner = threading.get_ident()
+        self.pump()
+        try:
+            while not self._stopped.is_set():
+                if until_idle and self._events.empty() and self.is_idle():
+                    break
+                timeout = max(0.0, self._wakeup_at - time.time()) if self._wakeup_at else None
+                try:
+                    event = self._events.get(timeout=timeout)
+                except queue.Empty:
+                    self.pump()
+                    continue
+                self.dispatch(event)
+        finally:
+            self.shutdown()
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Interrupt running downloads, keeping their partial files and queue entries for a resume"""
+        self._stopped.set()
+        self._on_wakeup(None)
+        for job in list(self._jobs.values()):
+            job.cancel(cleanup=False)
+        deadline = time.monotonic() + timeout
+        for thread in list(self._threads.values()):
+            thread.join(max(0.0, deadline - time.monotonic()))
+        if self._process_pool is not None:
+            self._process_pool.close()
+            self._process_pool = None
+        self._prefetcher.shutdown()
+
+    def dispatch(self, event: tuple) -> None:
+        """Handle an event delivered by ``post``; owner thread only"""
+        kind = event[0]
+        if kind == "call":
+            event[1](*event[2:])
+        elif kind == "progress":
+            self._on_progress(event[1], event[2])
+        elif kind == "resumed":
+            _, item, nbytes = event
+            item.resumed_bytes = nbytes
+            self.queue_manager.update_queue_item(item, 'resumed_bytes')
+            self._on_event("resumed", item, nbytes)
+        elif kind == "transferred":
+            self._on_transferred(event[1])
+        elif kind == "checksum":
+            _, item, path, checksum = event
+            item.file_path = path
+            item.checksum = checksum
+        elif kind == "done":
+            self._on_done(*event[1:])
+
+    # --- State, owner thread ---
+
+    def is_idle(self) -> bool:
+        return not self._active and not self._processing and self.queue_manager.next_pending() is None
+
+    def active_items(self) -> List[DownloadItem]:
+        return list(self._active.values())
+
+    def processing_items(self) -> List[DownloadItem]:
+        return list(self._processing.values())
+
+    def active_count(self) -> int:
+        return len(self._active)
+
+    def processing_count(self) -> int:
+        return len(self._processing)
+
+    def pending_count(self) -> int:
+        return len(self.queue_manager.get_pending())
+
+    def batch_title(self, batch_id: str) -> Optional[str]:
+        batch = self._batches.get(batch_id)
+        return batch["title"] if batch else None
+
+    # --- Queue bookkeeping, owner thread ---
+
+    def _submit(self, items: List[DownloadItem], info: Optional[Dict[str, Any]]) -> None:
+        duplicates = {item.id for item in self.queue_manager.enqueue_many(items)}
+        queued = [item for item in items if item.id not in duplicates]
+        self._track_batches(queued)
+        if info and len(queued) == 1:
+            self._prefetcher.seed(queued[0], info)
+        for item in items:
+            self._on_event("duplicate" if item.id in duplicates else "queued", item, None)
+        self.pump()
+
+    def _resume(self) -> None:
+        self._track_batches(self.queue_manager.get_queue())
+        self.pump()
+
+    def _cancel(self, item_id: str) -> None:
+        job = self._jobs.get(item_id)
+        if job is not None:
+            job.cancel()
+            return
+        item = self.queue_manager.queue.get(item_id)
+        if item is not None and item.status == DownloadStatus.PENDING:
+            item.status = DownloadStatus.CANCELLED
+            item.error_message = None
+            self._prefetcher.discard(item.id)
+            self._disk_deferred.pop(item.id, None)
+            self._finish(item, False, "Download cancelled.")
+
+    def _cancel_all(self) -> None:
+        for item in self.queue_manager.get_pending():
+            self._cancel(item.id)
+        for item_id in list(self._jobs):
+            self._cancel(item_id)
+
+    def _set_priority(self, item_id: str, priority: int) -> None:
+        item = self.queue_manager.queue.get(item_id)
+        if item is not None and item.status == DownloadStatus.PENDING:
+            self.queue_manager.set_priority(item, priority)
+            self._on_event("queued", item, None)
+            self.pump()
+
+    def _set_max_concurrent(self, value: int) -> None:
+        self._max_concurrent = max(1, int(value))
+        if self._process_pool is not None:
+            self._process_pool.set_max_processes(self._pool_size())
+        self.pump()
+
+    def _set_batch_limit(self, value: int) -> None:
+        self._batch_limit = max(0, int(value))
+        self.pump()
+
+    def _track_batches(self, items: List[DownloadItem]) -> None:
+        for item in items:
+            if item.batch_id:
+                batch = self._batches.setdefault(
+                    item.batch_id, {"title": item.batch_title, "total": 0, "finished": 0, "progress": {}}
+                )
+                batch["total"] += 1
+
+    def _report_batch(self, item: DownloadItem) -> None:
+        batch = self._batches.get(item.batch_id)
+        if batch is None:
+            return
+        percent = sum(batch["progress"].values()) // max(1, batch["total"])
+        self._on_event("batch", item, (batch["finished"], batch["total"], percent))
+        if batch["finished"] >= batch["total"]:
+            del self._batches[item.batch_id]
+
+    def _finish_batch_entry(self, item: DownloadItem) -> None:
+        batch = self._batches.get(item.batch_id) if item.batch_id else None
+        if batch is not None:
+            batch["finished"] += 1
+            batch["progress"][item.id] = 100
+            self._report_batch(item)
+
+    def _not_before(self, item: DownloadItem) -> float:
+        """Epoch time before which the item must wait: its retry delay or a host's rate-limit pause"""
+        return max(item.retry_at or 0.0, self._retry_engine.paused_until(item.url))
+
+    def _can_start(self, item: DownloadItem) -> bool:
+        if self._not_before(item) > time.time():
+            return False
+        if item.batch_id and self._batch_limit > 0:
+            running = sum(1 for active in self._active.values() if active.batch_id == item.batch_id)
+            if running >= self._batch_limit:
+                return False
+        return self._fits_on_disk(item)
+
+    def _download_estimate(self, item: DownloadItem) -> Optional[int]:
+        return estimate_download_size(self._prefetcher.peek(item.id), item.options)
+
+    def _fits_on_disk(self, item: DownloadItem) -> bool:
+        """Hold back items whose estimated size does not fit on their output volume"""
+        missing = self._disk.shortfall(output_dir_for(item.options), self._download_estimate(item))
+        if not missing:
+            self._disk_deferred.pop(item.id, None)
+            return True
+        if item.id not in self._disk_deferred:
+            self._on_event("deferred", item, missing)
+        self._disk_deferred[item.id] = missing
+        return False
+
+    def pump(self) -> None:
+        """Start queued items while slots are free; owner thread only"""
+        while not self._stopped.is_set():
+            if len(self._active) < self._max_concurrent:
+                item = self.queue_manager.next_pending(self._can_start)
+            elif len(self._active) < self._max_concurrent + INTERACTIVE_SLOTS:
+                item = self.queue_manager.next_pending(self._can_start, min_priority=PRIORITY_HIGH)
+            else:
+                break
+            if item is None:
+                break
+            self._start(item)
+        if self._stopped.is_set():
+            return
+        # Extract the items that get the next free slots while the current ones download
+        now = time.time()
+        upcoming, due = [], []
+        for item in self.queue_manager.pending_in_start_order():
+            not_before = self._not_before(item)
+            if not_before > now:
+                due.append(not_before)
+            # Includes items waiting for disk space: their info replaces the provisional size they were held back with
+            elif len(upcoming) < self._max_concurrent:
+                upcoming.append(item)
+        if self._disk_deferred:
+            due.append(now + DISK_RECHECK_SECONDS)
+        self._prefetcher.prefetch(upcoming)
+        self._wakeup_at = min(due) + 0.05 if due else None
+        self._on_wakeup(self._wakeup_at)
+
+    def _start(self, item: DownloadItem) -> None:
+        self.queue_manager.mark_started(item)
+        self._disk.reserve(item.id, output_dir_for(item.options), self._download_estimate(item))
+        job = self._create_job(item)
+        thread = threading.Thread(target=self._run_job, args=(item, job), name=f"download-{item.id[:8]}", daemon=True)
+        self._active[item.id] = item
+        self._jobs[item.id] = job
+        self._threads[item.id] = thread
+        self._on_event("started", item, None)
+        thread.start()
+
+    def _create_job(self, item: DownloadItem) -> Job:
+        info = self._prefetcher.take(item.id)
+        options = item.options
+        if "concurrent_fragment_downloads" not in options:
+            # Chosen per run and not journaled, so a resumed item is tuned again
+            fragments = self._fragment_tuner.suggest(item.url)
+            options = {**options, "concurrent_fragment_downloads": fragments}
+            self._tuning[item.id] = TuningSample(item.url, fragments)
+
+        callbacks = dict(
+            on_progress=lambda progress, i=item: self._post("progress", i, progress),
+            on_resumed=lambda nbytes, fragment, i=item: self._post("resumed", i, nbytes),
+            on_transferred=lambda i=item: self._post("transferred", i),
+            on_checksum=lambda path, checksum, i=item: self._post("checksum", i, path, checksum),
+            info=info,
+        )
+        if self._backend == BACKEND_PROCESS:
+            if self._process_pool is None:
+                self._process_pool = DownloadProcessPool(self._pool_size(), self._governor, self._postprocess_slots)
+            return PooledJob(item.url, options, self._process_pool, **callbacks)
+        return DownloadJob(
+            item.url, options, governor=self._governor, postprocess_slots=self._postprocess_slots, **callbacks
+        )
+
+    def _pool_size(self) -> int:
+        # A process stays busy while its job post-processes, so the pool also covers those
+        return self._max_concurrent + INTERACTIVE_SLOTS + POSTPROCESS_WORKERS
+
+    def _run_job(self, item: DownloadItem, job: Job) -> None:
+        try:
+            job.run()
+            self._post("done", item, True, "Download complete.", None)
+        except DownloadCancelled:
+            self._post("done", item, False, "Download cancelled.", None)
+        except Exception as exc:
+            self._post("done", item, False, "Download failed.", str(exc))
+
+    def _on_progress(self, item: DownloadItem, progress: DownloadProgress) -> None:
+        if progress.phase == "downloading" and progress.speed:
+            item.download_speed = progress.speed_text()
+        if progress.phase == "finished" and progress.total_bytes:
+            # Video and audio of merged formats arrive as separate files
+            item.file_size = (item.file_size or 0) + progress.total_bytes
+        if progress.phase == "downloading":
+            finished = item.file_size or 0
+            self._disk.update(item.id, finished + progress.downloaded_bytes, finished + (progress.total_bytes or 0))
+        if item.id in self._tuning:
+            self._tuning[item.id].observe(progress)
+        self._on_event("progress", item, progress)
+        if item.batch_id in self._batches:
+            self._batches[item.batch_id]["progress"][item.id] = progress.percent
+            self._report_batch(item)
+
+    def _on_transferred(self, item: DownloadItem) -> None:
+        """Hand the download slot to the next item while this one post-processes"""
+        if self._active.pop(item.id, None) is None:
+            return
+        self._processing[item.id] = item
+        item.status = DownloadStatus.PROCESSING
+        self.queue_manager.update_queue_item(item, 'status')
+        self._on_event("processing", item, None)
+        self.pump()
+
+    def _record_tuning(self, item: DownloadItem, ok: bool, cancelled: bool, error: Optional[str]) -> None:
+        tuning = self._tuning.pop(item.id, None)
+        if tuning is None or cancelled:
+            return
+        # Resumed transfers and a total speed cap would skew the measured throughput
+        tuning.report(self._fragment_tuner, ok, error, skewed=bool(item.resumed_bytes or self._governor.rate))
+
+    def _on_done(self, item: DownloadItem, ok: bool, message: str, error: Optional[str]) -> None:
+        if self._stopped.is_set():
+            return  # Interrupted by shutdown: the item stays queued for the next run
+        self._active.pop(item.id, None)
+        self._processing.pop(item.id, None)
+        self._threads.pop(item.id, None)
+        job = self._jobs.pop(item.id, None)
+        cancelled = job is not None and job.is_cancelled()
+        self._disk.release(item.id)
+
+        self._record_tuning(item, ok, cancelled, error)
+        if not ok and not cancelled:
+            delay = self._retry_engine.plan(item.url, error or message, item.attempts)
+            if delay is not None:
+                self._retry(item, error or message, delay)
+                return
+
+        if cancelled:
+            item.status = DownloadStatus.CANCELLED
+            item.error_message = None
+        elif ok:
+            item.status = DownloadStatus.COMPLETED
+            item.error_message = None
+        else:
+            item.status = DownloadStatus.FAILED
+            item.error_message = error or message
+        self._finish(item, ok, error or message)
+
+    def _retry(self, item: DownloadItem, error: str, delay: float) -> None:
+        """Send a transiently failed item back to the queue to start again after ``delay`` seconds"""
+        item.attempts += 1
+        item.error_message = f"{ERROR_LABELS[classify_error(error)]}: {error}"
+        item.download_speed = None
+        item.file_size = None  # Re-counted from the finished events of the next attempt
+        item.file_path = item.checksum = None
+        self.queue_manager.requeue(item, time.time() + delay)
+        self._on_event("retrying", item, delay)
+        self.pump()
+
+    def _finish(self, item: DownloadItem, ok: bool, message: str) -> None:
+        item.completed_at = datetime.now()
+        self.queue_manager.mark_finished(item)
+        self.queue_manager.add_to_history(item)
+        self._finish_batch_entry(item)
+        self._on_event("finished", item, (ok, message))
+        self.pump()
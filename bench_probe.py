@@ -0,0 +1,84 @@
+"""Per-probe latency with a new YoutubeDL per probe versus the shared ProbeService.
+
+    python bench_probe.py                # probes a file served from localhost
+    python bench_probe.py --url URL -n 10
+
+The local default measures only what the probe service saves (instance
+setup and connections); probes of real sites add their network time to both
+columns. The first probe also pays one-time extractor setup; ``--warm-up``
+does that before measuring, as the window does at startup.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, List
+
+import yt_dlp
+
+from media_info import SilentLogger
+from probe_service import ProbeService, probe_options
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+def serve_sample() -> str:
+    """Serve a small file on localhost and return its URL"""
+    directory = tempfile.mkdtemp(prefix="bench_probe_")
+    with open(os.path.join(directory, "sample.mp4"), "wb") as f:
+        f.write(os.urandom(64 * 1024))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(_QuietHandler, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}/sample.mp4"
+
+
+def time_probes(probe: Callable[[], object], count: int) -> List[float]:
+    timings = []
+    for _ in range(count):
+        started = time.perf_counter()
+        probe()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="URL to probe (default: a file served from localhost)")
+    parser.add_argument("-n", "--count", type=int, default=20, help="probes per mode (default: 20)")
+    parser.add_argument("--warm-up", action="store_true", help="do the one-time extractor setup before measuring")
+    args = parser.parse_args()
+    url = args.url or serve_sample()
+
+    def fresh_probe() -> None:
+        with yt_dlp.YoutubeDL({**probe_options(False), "logger": SilentLogger()}) as ydl:
+            ydl.extract_info(url, download=False)
+
+    service = ProbeService(factory=lambda options: yt_dlp.YoutubeDL({**options, "logger": SilentLogger()}))
+    if args.warm_up:
+        service.warm_up()
+
+    results = [
+        ("new YoutubeDL per probe", time_probes(fresh_probe, args.count)),
+        ("ProbeService", time_probes(partial(service.extract, url), args.count)),
+    ]
+    service.close()
+
+    print(f"{args.count} probes of {url}")
+    print(f"{'':<26}{'first':>9}{'median':>9}{'p90':>9}  (ms)")
+    for label, timings in results:
+        rest = sorted(timings[1:]) or timings
+        p90 = rest[min(len(rest) - 1, int(len(rest) * 0.9))]
+        print(f"{label:<26}{timings[0]:>9.1f}{statistics.median(rest):>9.1f}{p90:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+from PySide6.QtCore import Qt, Signal
+from PySide6.QtWidgets import (
+    QDialog,
+    QVBoxLayout,
+    QHBoxLayout,
+    QTableWidget,
+    QTableWidgetItem,
+    QPushButton,
+    QLabel,
+    QMessageBox,
+    QHeaderView,
+    QAbstractItemView,
+    QPlainTextEdit,
+    QFileDialog,
+)
+
+from bulk_probe import parse_url_list
+from download_archive import DownloadArchive
+from metadata_cache import MetadataCache
+from ytdl_worker import BulkProbeWorker
+
+
+class BulkAnalyzeDialog(QDialog):
+    """Analyze many pasted or imported URLs at once and queue the ones that work"""
+
+    download_requested = Signal(list)  # summaries from bulk_probe.summarize_info
+
+    def __init__(self, archive: DownloadArchive, cache: Optional[MetadataCache] = None, parent=None):
+        super().__init__(parent)
+        self.archive = archive
+        self.cache = cache
+        self.setWindowTitle("Bulk Analyze")
+        self.setMinimumSize(900, 600)
+
+        self.worker: Optional[BulkProbeWorker] = None
+        self.summaries: List[Optional[Dict[str, Any]]] = []
+        self.finished_count = 0
+        self.failed_count = 0
+        self.setup_ui()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        self.url_input = QPlainTextEdit()
+        self.url_input.setPlaceholderText("Paste video links here, one per line")
+        self.url_input.setMaximumHeight(140)
+        layout.addWidget(self.url_input)
+
+        controls = QHBoxLayout()
+        self.import_btn = QPushButton("Import File...")
+        self.analyze_btn = QPushButton("Analyze")
+        self.analyze_btn.setObjectName("AccentButton")
+        self.status_label = QLabel("")
+        controls.addWidget(self.import_btn)
+        controls.addWidget(self.status_label, 1)
+        controls.addWidget(self.analyze_btn)
+        layout.addLayout(controls)
+
+        self.table = QTableWidget()
+        self.table.setColumnCount(5)
+        self.table.setHorizontalHeaderLabels(["Status", "Title", "Channel", "Duration", "URL"])
+        header_view = self.table.horizontalHeader()
+        header_view.setSectionResizeMode(0, QHeaderView.ResizeToContents)  # Status
+        header_view.setSectionResizeMode(1, QHeaderView.Stretch)  # Title
+        header_view.setSectionResizeMode(2, QHeaderView.ResizeToContents)  # Channel
+        header_view.setSectionResizeMode(3, QHeaderView.ResizeToContents)  # Duration
+        header_view.setSectionResizeMode(4, QHeaderView.Interactive)  # URL
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        layout.addWidget(self.table)
+
+        buttons = QHBoxLayout()
+        self.download_selected_btn = QPushButton("Download Selected")
+        self.download_all_btn = QPushButton("Download All")
+        close_btn = QPushButton("Close")
+        buttons.addStretch(1)
+        buttons.addWidget(self.download_selected_btn)
+        buttons.addWidget(self.download_all_btn)
+        buttons.addWidget(close_btn)
+        layout.addLayout(buttons)
+
+        self.import_btn.clicked.connect(self.import_file)
+        self.analyze_btn.clicked.connect(self.toggle_analyze)
+        self.download_selected_btn.clicked.connect(self.download_selected)
+        self.download_all_btn.clicked.connect(self.download_all)
+        close_btn.clicked.connect(self.close)
+        self.update_buttons()
+
+    def import_file(self):
+        """Append the URLs of a text file to the input"""
+        filename, _ = QFileDialog.getOpenFileName(self, "Import URLs", "", "Text Files (*.txt);;All Files (*)")
+        if not filename:
+            return
+        try:
+            with open(filename, 'r', encoding='utf-8') as f:
+                text = f.read()
+        except Exception as e:
+            QMessageBox.critical(self, "Import Failed", f"Failed to read {filename}: {str(e)}")
+            return
+        current = self.url_input.toPlainText().rstrip()
+        self.url_input.setPlainText(f"{current}\n{text}" if current else text)
+
+    def toggle_analyze(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            self.analyze_btn.setEnabled(False)
+            self.status_label.setText("Stopping after the running probes...")
+            return
+        urls = parse_url_list(self.url_input.toPlainText())
+        if not urls:
+            QMessageBox.warning(self, "No URLs", "Paste or import at least one video link.")
+            return
+        self.start_analysis(urls)
+
+    def start_analysis(self, urls: List[str]):
+        self.summaries = [None] * len(urls)
+        self.finished_count = 0
+        self.failed_count = 0
+        self.table.setRowCount(len(urls))
+        for row, url in enumerate(urls):
+            self.set_row(row, "Waiting", "", "", "", url)
+
+        self.worker = BulkProbeWorker(urls, cache=self.cache)
+        self.worker.result.connect(self.on_result)
+        self.worker.finished.connect(self.on_analysis_finished)
+        self.worker.start()
+        self.analyze_btn.setText("Stop")
+        self.url_input.setReadOnly(True)
+        self.import_btn.setEnabled(False)
+        self.update_status()
+        self.update_buttons()
+
+    def set_row(self, row: int, status: str, title: str, channel: str, duration: str, url: str):
+        for column, text in enumerate((status, title, channel, duration, url)):
+            self.table.setItem(row, column, QTableWidgetItem(text))
+
+    def on_result(self, row: int, summary: Optional[Dict[str, Any]], error: str):
+        """Fill in one row as soon as its probe completes"""
+        self.finished_count += 1
+        url = self.table.item(row, 4).text()
+        if summary is None:
+            self.failed_count += 1
+            self.set_row(row, "Failed", error, "", "", url)
+            self.table.item(row, 0).setBackground(Qt.red)
+            self.table.item(row, 1).setToolTip(error)
+        else:
+            self.summaries[row] = summary
+            entries = summary.get("entries")
+            if entries is not None:
+                status, duration = "Playlist", f"{len(entries)} videos"
+            elif summary.get("archive_key") in self.archive:
+                status, duration = "Already downloaded", self.format_duration(summary.get("duration"))
+            else:
+                status, duration = "Ready", self.format_duration(summary.get("duration"))
+            self.set_row(row, status, summary["title"], summary["uploader"], duration, url)
+            if status == "Ready":
+                self.table.item(row, 0).setBackground(Qt.green)
+            elif status == "Already downloaded":
+                self.table.item(row, 0).setBackground(Qt.yellow)
+        self.update_status()
+        self.update_buttons()
+
+    def on_analysis_finished(self):
+        skipped = len(self.summaries) - self.finished_count
+        for row in range(self.table.rowCount()):
+            if self.table.item(row, 0).text() == "Waiting":
+                self.table.item(row, 0).setText("Skipped")
+        self.worker = None
+        self.analyze_btn.setText("Analyze")
+        self.analyze_btn.setEnabled(True)
+        self.url_input.setReadOnly(False)
+        self.import_btn.setEnabled(True)
+        self.update_status(skipped)
+        self.update_buttons()
+
+    def update_status(self, skipped: int = 0):
+        total = len(self.summaries)
+        text = f"{self.finished_count}/{total} analyzed"
+        if self.failed_count:
+            text += f" • {self.failed_count} failed"
+        if skipped:
+            text += f" • {skipped} skipped"
+        self.status_label.setText(text)
+
+    def update_buttons(self):
+        has_results = any(summary is not None for summary in self.summaries)
+        self.download_selected_btn.setEnabled(has_results)
+        self.download_all_btn.setEnabled(has_results)
+
+    def format_duration(self, duration: Optional[float]) -> str:
+        if not duration:
+            return ""
+        minutes, seconds = divmod(int(duration), 60)
+        hours, minutes = divmod(minutes, 60)
+        return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+    def download_selected(self):
+        rows = sorted({index.row() for index in self.table.selectionModel().selectedRows()})
+        # Selected rows are queued even if they were downloaded before
+        self.request_download([self.summaries[row] for row in rows if self.summaries[row] is not None])
+
+    def download_all(self):
+        self.request_download([
+            summary for row, summary in enumerate(self.summaries)
+            if summary is not None and self.table.item(row, 0).text() != "Already downloaded"
+        ])
+
+    def request_download(self, summaries: List[Dict[str, Any]]):
+        if not summaries:
+            QMessageBox.information(self, "Nothing To Download", "No analyzed videos to download.")
+            return
+        self.download_requested.emit(summaries)
+
+    def closeEvent(self, event):
+        """Stop probing when the dialog is closed"""
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker.wait()
+        event.accept()
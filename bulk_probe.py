@@ -0,0 +1,112 @@
+"""Probing many URLs at once for the bulk analyze dialog.
+
+Probes are network-bound, so a bounded thread pool is enough to overlap
+them; each thread checks a warm YoutubeDL out of a probe service sized to
+the pool, so no probe pays yt-dlp's setup. Results are reported one by one
+as they complete, and only the fields the queue needs are kept per URL.
+"""
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+import yt_dlp
+
+from download_archive import archive_key_for_info, archive_key_for_url
+from media_info import SilentLogger, extract_url_metadata, is_playlist_info, list_playlist_entries
+from probe_service import ProbeService
+
+if TYPE_CHECKING:
+    from metadata_cache import MetadataCache
+
+
+# Probes running at once; extraction sites start rate limiting beyond a handful
+BULK_PROBE_WORKERS = 8
+
+
+def parse_url_list(text: str) -> List[str]:
+    """URLs in pasted text or a URL file: whitespace separated, '#' lines are comments, first occurrence kept"""
+    urls: List[str] = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            urls.extend(line.split())
+    return list(dict.fromkeys(urls))
+
+
+def summarize_info(url: str, info: Dict[str, Any]) -> Dict[str, Any]:
+    """What the bulk table and the download queue need from an info dict, without its formats"""
+    thumbs = info.get("thumbnails") or []
+    summary = {
+        "url": info.get("webpage_url") or url,
+        "title": info.get("title") or url,
+        "uploader": info.get("uploader") or info.get("channel") or "Unknown",
+        "duration": info.get("duration"),
+        "thumbnail": info.get("thumbnail") or (thumbs[-1].get("url") if thumbs else None),
+        "archive_key": archive_key_for_info(info) or archive_key_for_url(url),
+        "entries": None,
+    }
+    if is_playlist_info(info):
+        summary["entries"] = list_playlist_entries(info)
+    return summary
+
+
+def error_text(error: BaseException) -> str:
+    message = str(error).strip() or type(error).__name__
+    return message[len("ERROR: "):] if message.startswith("ERROR: ") else message
+
+
+class BulkProbe:
+    """Probes ``urls`` on a bounded thread pool.
+
+    ``on_result(index, summary, error)`` is called from the pool threads as
+    each probe completes, with a summarize_info dict or an error message.
+    """
+
+    def __init__(
+        self,
+        urls: List[str],
+        on_result: Callable[[int, Optional[Dict[str, Any]], Optional[str]], None],
+        workers: int = BULK_PROBE_WORKERS,
+        cache: Optional[MetadataCache] = None,
+    ) -> None:
+        self.urls = urls
+        self.workers = max(1, workers)
+        self.cache = cache
+        self._on_result = on_result
+        self._cancel_event = threading.Event()
+
+    def cancel(self) -> None:
+        """Skip the probes that have not started; running ones still report"""
+        self._cancel_event.set()
+
+    def run(self) -> None:
+        """Probe every URL and return when all have reported or were skipped"""
+        service = ProbeService(
+            pool_size=self.workers,
+            factory=lambda options: yt_dlp.YoutubeDL({**options, "logger": SilentLogger()}),
+        )
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bulk-probe") as executor:
+                futures = [executor.submit(self._probe, service, index, url) for index, url in enumerate(self.urls)]
+                for _ in as_completed(futures):
+                    if self._cancel_event.is_set():
+                        for future in futures:
+                            future.cancel()
+                        break
+        finally:
+            service.close()
+
+    def _probe(self, service: ProbeService, index: int, url: str) -> None:
+        if self._cancel_event.is_set():
+            return
+        try:
+            # Lists a playlist's entries without resolving each one; a single video is resolved as usual
+            info = extract_url_metadata(url, playlist=True, cache=self.cache, service=service)
+            if not info:
+                raise ValueError("No video information found")
+            summary, error = summarize_info(url, info), None
+        except Exception as exc:
+            summary, error = None, error_text(exc)
+        self._on_result(index, summary, error)
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import os
+import shutil
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+# Free space always left on an output volume, on top of the reservations
+MIN_FREE_BYTES = 512 * 1024 * 1024
+# Merging and conversion write the output while the downloaded inputs still exist
+POSTPROCESS_FACTOR = 2.0
+# Reading free space is a syscall per check; queue scans reuse a reading this long
+FREE_SPACE_CACHE_SECONDS = 1.0
+# How often deferred items look again, since other programs may free space meanwhile
+DISK_RECHECK_SECONDS = 30.0
+# Held for a download whose size is unknown when it starts, until its progress reports one
+UNKNOWN_SIZE_RESERVE = 2 * 1024 * 1024 * 1024
+
+
+def output_dir_for(ydl_opts: Dict[str, Any]) -> str:
+    """Directory a download with ``ydl_opts`` writes to, up to the first template field"""
+    outtmpl = ydl_opts.get("outtmpl") or {}
+    template = outtmpl.get("default", "") if isinstance(outtmpl, dict) else str(outtmpl)
+    fixed = template.split("%(", 1)[0]
+    directory = fixed if fixed.endswith(("/", os.sep)) else os.path.dirname(fixed)
+    return directory or os.getcwd()
+
+
+def estimate_download_size(info: Optional[Dict[str, Any]], ydl_opts: Dict[str, Any]) -> Optional[int]:
+    """Peak disk use of downloading ``info`` with ``ydl_opts``, or None when the size is unknown.
+
+    Uses the size yt-dlp reports for the selected format(s) and falls back to
+    bitrate times duration.
+    """
+    if not info:
+        return None
+    size = info.get("filesize") or info.get("filesize_approx")
+    if not size and info.get("tbr") and info.get("duration"):
+        size = info["tbr"] * 1000 / 8 * info["duration"]  # tbr is in KBit/s
+    if not size:
+        return None
+    merged = "+" in str(info.get("format_id") or "")
+    # A streaming merge writes only the final file (see stream_merge.can_stream_merge)
+    streamed = merged and ydl_opts.get("stream_merge") and not ydl_opts.get("ratelimit")
+    if (merged and not streamed) or ydl_opts.get("postprocessors"):
+        size *= POSTPROCESS_FACTOR
+    return int(size)
+
+
+@dataclass
+class Reservation:
+    volume: int
+    path: str
+    estimate: int
+    written: int = 0
+    provisional: bool = False  # estimate is UNKNOWN_SIZE_RESERVE, not a reported size
+
+    @property
+    def outstanding(self) -> int:
+        """Space the job will still take; what it wrote is already gone from the free space"""
+        return max(0, self.estimate - self.written)
+
+
+class DiskSpaceLedger:
+    """Admission control for downloads against the free space of their output volumes.
+
+    Each started job reserves its estimated size; a new job is admitted only if
+    its estimate fits into the free space minus the outstanding reservations of
+    the jobs on the same volume and a safety margin. A job of unknown size
+    counts as ``unknown_size`` until it reports its real size, so a batch
+    started before its metadata was extracted cannot overcommit the volume;
+    on a volume without running jobs it is admitted as long as the margin is
+    free. Qt-free and thread-safe.
+    """
+
+    def __init__(
+        self,
+        min_free: int = MIN_FREE_BYTES,
+        unknown_size: int = UNKNOWN_SIZE_RESERVE,
+        disk_usage: Callable[[str], Any] = shutil.disk_usage,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.min_free = min_free
+        self.unknown_size = unknown_size
+        self._disk_usage = disk_usage
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._reservations: Dict[str, Reservation] = {}
+        self._free_cache: Dict[str, Tuple[float, int, int]] = {}  # path -> (read at, volume, free bytes)
+
+    def _probe(self, path: str) -> Optional[Tuple[int, int]]:
+        """Volume id and free bytes for ``path``, which may not exist yet"""
+        now = self._clock()
+        cached = self._free_cache.get(path)
+        if cached is not None and now - cached[0] < FREE_SPACE_CACHE_SECONDS:
+            return cached[1], cached[2]
+        existing = os.path.abspath(path or os.getcwd())
+        while not os.path.isdir(existing):
+            parent = os.path.dirname(existing)
+            if parent == existing:
+                return None
+            existing = parent
+        try:
+            volume = os.stat(existing).st_dev
+            free = int(self._disk_usage(existing).free)
+        except OSError:
+            return None
+        self._free_cache[path] = (now, volume, free)
+        return volume, free
+
+    def _outstanding(self, volume: int) -> int:
+        return sum(r.outstanding for r in self._reservations.values() if r.volume == volume)
+
+    def _busy(self, volume: int) -> bool:
+        return any(r.volume == volume for r in self._reservations.values())
+
+    def shortfall(self, path: str, nbytes: Optional[int]) -> int:
+        """Bytes missing on the volume of ``path`` for a new job of ``nbytes`` (0 if it fits)"""
+        with self._lock:
+            probe = self._probe(path)
+            if probe is None:
+                return 0  # Unknown volume: let the download report the real error
+            volume, free = probe
+            if nbytes is None:
+                # An idle volume still takes it, or a download that can never be estimated would wait forever
+                nbytes = self.unknown_size if self._busy(volume) else 0
+            available = free - self._outstanding(volume) - self.min_free
+            return max(0, nbytes - available)
+
+    def free_space(self, path: str) -> Optional[int]:
+        """Free bytes on the volume of ``path`` not yet promised to running jobs"""
+        with self._lock:
+            probe = self._probe(path)
+            if probe is None:
+                return None
+            volume, free = probe
+            return max(0, free - self._outstanding(volume))
+
+    def reserve(self, key: str, path: str, nbytes: Optional[int]) -> None:
+        with self._lock:
+            probe = self._probe(path)
+            if probe is not None:
+                if nbytes is None:
+                    self._reservations[key] = Reservation(probe[0], path, self.unknown_size, provisional=True)
+                else:
+                    self._reservations[key] = Reservation(probe[0], path, nbytes)
+
+    def update(self, key: str, written: int, expected: Optional[int] = None) -> None:
+        """Record bytes a job has written, raising its estimate when the real size turns out larger"""
+        with self._lock:
+            reservation = self._reservations.get(key)
+            if reservation is None:
+                return
+            reservation.written = max(reservation.written, written)
+            # A reported size replaces the provisional estimate, even a smaller one
+            if expected and (expected > reservation.estimate or reservation.provisional):
+                reservation.estimate = expected
+                reservation.provisional = False
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            reservation = self._reservations.pop(key, None)
+            if reservation is not None:
+                self._free_cache.pop(reservation.path, None)
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+
+# SQLite limits the number of bound parameters per statement
+_QUERY_CHUNK = 500
+
+
+def archive_key(extractor: Optional[str], video_id: Optional[str]) -> Optional[str]:
+    """Key in yt-dlp's download archive format, e.g. ``youtube dQw4w9WgXcQ``"""
+    if not extractor or not video_id:
+        return None
+    return f"{extractor.lower()} {video_id}"
+
+
+def archive_key_for_info(info: Dict[str, Any]) -> Optional[str]:
+    """Key for a full or flat (playlist entry) info dict"""
+    return archive_key(info.get("extractor_key") or info.get("ie_key"), info.get("id"))
+
+
+@lru_cache(maxsize=4096)
+def archive_key_for_url(url: str) -> Optional[str]:
+    """Key derived from the URL alone, without a network request.
+
+    Mirrors yt-dlp: the first extractor that accepts the URL provides the
+    video id. Returns None for URLs only the generic extractor handles.
+    """
+    from yt_dlp.extractor import gen_extractor_classes
+
+    for ie in gen_extractor_classes():
+        if ie.ie_key() == "Generic":
+            continue
+        try:
+            if ie.suitable(url):
+                return archive_key(ie.ie_key(), ie.get_temp_id(url))
+        except Exception:
+            continue
+    return None
+
+
+class DownloadArchive:
+    """Persistent set of finished downloads, indexed by archive key.
+
+    Backed by SQLite so lookups stay constant time and bulk filtering of a
+    playlist is a handful of indexed queries, however large the archive grows.
+    """
+
+    def __init__(self, path: os.PathLike) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS archive ("
+            " key TEXT PRIMARY KEY, url TEXT, title TEXT, added_at TEXT"
+            ") WITHOUT ROWID"
+        )
+        self._conn.commit()
+
+    def __contains__(self, key: Optional[str]) -> bool:
+        if not key:
+            return False
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM archive WHERE key = ?", (key,)).fetchone()
+        return row is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM archive").fetchone()[0]
+
+    def get(self, key: Optional[str]) -> Optional[Dict[str, str]]:
+        """The stored url, title and date for ``key``, if archived"""
+        if not key:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, title, added_at FROM archive WHERE key = ?", (key,)
+            ).fetchone()
+        return {"url": row[0], "title": row[1], "added_at": row[2]} if row else None
+
+    def archived(self, keys: Iterable[Optional[str]]) -> Set[str]:
+        """Subset of ``keys`` that is already archived"""
+        unique = list({key for key in keys if key})
+        found: Set[str] = set()
+        with self._lock:
+            for start in range(0, len(unique), _QUERY_CHUNK):
+                chunk = unique[start:start + _QUERY_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(f"SELECT key FROM archive WHERE key IN ({placeholders})", chunk)
+                found.update(row[0] for row in rows)
+        return found
+
+    def add(self, key: Optional[str], url: str = "", title: str = "") -> None:
+        if key:
+            self.add_many([(key, url, title)])
+
+    def add_many(self, entries: List[Tuple[str, str, str]]) -> None:
+        """Archive (key, url, title) entries in one transaction"""
+        now = datetime.now().isoformat()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO archive (key, url, title, added_at) VALUES (?, ?, ?, ?)",
+                [(key, url, title, now) for key, url, title in entries if key],
+            )
+            self._conn.commit()
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM archive WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,362 @@
+from __future__ import annotations
+
+import glob
+import json
+import multiprocessing
+import os
+import re
+import threading
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import yt_dlp
+from yt_dlp.postprocessor.common import PostProcessor
+from yt_dlp.utils import DownloadCancelled, DownloadError, PostProcessingError
+
+from bandwidth_governor import BandwidthConsumer, BandwidthGovernor
+from download_progress import DownloadProgress, ProgressThrottle, PROGRESS_UPDATES_PER_SECOND
+from file_integrity import FollowingHasher, hash_file
+from media_info import SilentLogger
+from segmented_downloader import SEGMENTS_SUFFIX, SegmentedHttpFD, journal_bytes, segment_connections
+from stream_merge import STREAM_MERGE_DOWNLOADERS, StreamProgress, can_stream_merge, watch_processes
+
+
+# Post-processing jobs (merge, transcode, embed) running at once; ffmpeg itself is multi-threaded
+POSTPROCESS_WORKERS = max(1, min(4, (os.cpu_count() or 2) // 2))
+
+
+def create_postprocess_slots(count: int = POSTPROCESS_WORKERS):
+    """Semaphore bounding post-processing across download threads and pool processes"""
+    return multiprocessing.get_context("spawn").BoundedSemaphore(max(1, count))
+
+
+def _partial_names(base_path: str) -> Tuple[str, List[str]]:
+    """Directory of ``base_path`` and the names in it that belong to its download"""
+    directory, name = os.path.split(base_path)
+    stem = re.escape(os.path.splitext(name)[0])
+    # <stem>.<ext> or <stem>.f<format id>.<ext>, as yt-dlp names the final and per-format files;
+    # other videos whose titles merely start with the same text do not match
+    pattern = re.compile(stem + r"(?:\.f[^.]+)?\.[^.]+\.(?:part(?:-Frag\d+)?|ytdl)")
+    try:
+        names = os.listdir(directory or ".")
+    except OSError:
+        names = []
+    return directory, [n for n in names if pattern.fullmatch(n)]
+
+
+def find_partial_state(base_path: str) -> Tuple[int, int]:
+    """Return (bytes, fragment index) already on disk for a download target.
+
+    ``base_path`` is the output filename yt-dlp would produce; the per-format
+    ``.part`` files, fragment files and ``.ytdl`` fragment journals are named
+    after its stem.
+    """
+    directory, names = _partial_names(base_path)
+    partial_bytes = 0
+    fragment_index = 0
+    for name in names:
+        path = os.path.join(directory, name)
+        if name.endswith(".ytdl"):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    state = json.load(f)
+                index = state["downloader"]["current_fragment"]["index"]
+                fragment_index = max(fragment_index, int(index))
+            except Exception:
+                pass
+        else:
+            try:
+                # A segmented .part file has its final size from the start
+                written = journal_bytes(path)
+                partial_bytes += os.path.getsize(path) if written is None else written
+            except OSError:
+                pass
+    return partial_bytes, fragment_index
+
+
+def remove_partial_files(paths: Set[str]) -> None:
+    """Delete download outputs and their .part/.ytdl/fragment leftovers"""
+    candidates: Set[str] = set()
+    for path in paths:
+        candidates.update((path, path + ".part", path + ".ytdl", path + SEGMENTS_SUFFIX, path + ".part" + SEGMENTS_SUFFIX))
+        candidates.update(glob.glob(glob.escape(path) + "-Frag*"))
+    for path in candidates:
+        try:
+            if os.path.isfile(path):
+                os.remove(path)
+        except OSError:
+            pass
+
+
+class _ResumeProbePP(PostProcessor):
+    """Runs right before the transfer and reports partial data left by an earlier attempt."""
+
+    def __init__(self, on_resumed: Callable[[int, int], None], downloader=None) -> None:
+        super().__init__(downloader)
+        self._on_resumed = on_resumed
+
+    def run(self, info: Dict[str, Any]):
+        try:
+            target = self._downloader.prepare_filename(info)
+            partial_bytes, fragment_index = find_partial_state(target)
+            if partial_bytes or fragment_index:
+                self._on_resumed(partial_bytes, fragment_index)
+        except Exception:
+            pass  # Resume detection is informational only
+        return [], info
+
+
+class _DeferredPostProcessYDL(yt_dlp.YoutubeDL):
+    """YoutubeDL that records the post-processing step instead of running it after each transfer.
+
+    ``process_info`` calls ``post_process`` once the media files are on disk;
+    everything it runs (merging, FFmpeg PPs, moving files into place) is kept
+    for ``run_deferred_post_processing`` so the caller can release the network
+    slot first. With the ``stream_merge`` option, "video+audio" formats are
+    muxed by one ffmpeg while downloading (see stream_merge); with
+    ``connections_per_file``, progressive HTTP formats are fetched over several
+    connections (see segmented_downloader).
+    """
+
+    def __init__(self, params: Dict[str, Any]) -> None:
+        super().__init__(params)
+        self._deferred: List[Tuple[str, Dict[str, Any], Optional[Dict[str, str]]]] = []
+        self.final_paths: List[str] = []
+
+    def process_info(self, info_dict):
+        if not self.params.get("stream_merge"):
+            return super().process_info(info_dict)
+        saved = self.params.get("external_downloader")
+        try:
+            return super().process_info(info_dict)
+        finally:
+            self.params["external_downloader"] = saved
+
+    def pre_process(self, ie_info, key="pre_process", files_to_move=None):
+        info, files_to_move = super().pre_process(ie_info, key, files_to_move)
+        # Runs right before the downloader is chosen, after subtitles and thumbnails were fetched
+        if key == "before_dl" and can_stream_merge(info, self.params):
+            self.params["external_downloader"] = STREAM_MERGE_DOWNLOADERS
+        return info, files_to_move
+
+    def dl(self, name, info, subtitle=False, test=False):
+        if self.params.get("external_downloader") is STREAM_MERGE_DOWNLOADERS and info.get("requested_formats"):
+            with watch_processes(StreamProgress(info, self._progress_hooks)):
+                return super().dl(name, info, subtitle, test)
+        connections = 0 if test or subtitle or name == "-" else segment_connections(info, self.params)
+        if not connections:
+            return super().dl(name, info, subtitle, test)
+        fd = SegmentedHttpFD(self, self.params, connections)
+        for hook in self._progress_hooks:
+            fd.add_progress_hook(hook)
+        new_info = self._copy_infodict(info)
+        if new_info.get("http_headers") is None:
+            new_info["http_headers"] = self._calc_headers(new_info)
+        return fd.download(name, new_info, subtitle)
+
+    def post_process(self, filename, info, files_to_move=None):
+        self._deferred.append((filename, info, files_to_move))
+        info["filepath"] = filename
+        return info
+
+    def has_deferred_post_processing(self) -> bool:
+        return bool(self._deferred)
+
+    def run_deferred_post_processing(self) -> None:
+        while self._deferred:
+            filename, info, files_to_move = self._deferred.pop(0)
+            try:
+                info = yt_dlp.YoutubeDL.post_process(self, filename, info, files_to_move)
+                if info.get("filepath"):
+                    self.final_paths.append(info["filepath"])
+            except PostProcessingError as err:
+                # Same report process_info gives for an inline post-processing failure
+                self.report_error(f"Postprocessing: {err}")
+
+
+class DownloadJob:
+    """One yt-dlp download with throttled progress, resume detection and cancellation.
+
+    Qt-free so it can run in a QThread, a pool process or a headless runner;
+    callbacks are invoked on the downloading thread. Post-processing runs after
+    ``on_transferred`` and, with ``postprocess_slots``, only while holding one
+    of its slots, so transcodes are bounded independently of downloads.
+    With a prefetched ``info`` dict the extraction step is skipped.
+    ``on_checksum(path, checksum)`` reports each finished file (see file_integrity).
+    """
+
+    def __init__(
+        self,
+        url: str,
+        ydl_opts: Dict[str, Any],
+        on_progress: Optional[Callable[[DownloadProgress], None]] = None,
+        on_resumed: Optional[Callable[[int, int], None]] = None,
+        progress_rate: float = PROGRESS_UPDATES_PER_SECOND,
+        governor: Optional[BandwidthGovernor] = None,
+        on_transferred: Optional[Callable[[], None]] = None,
+        postprocess_slots=None,
+        info: Optional[Dict[str, Any]] = None,
+        on_checksum: Optional[Callable[[str, str], None]] = None,
+    ) -> None:
+        self.url = url
+        self.ydl_opts = {**ydl_opts}
+        self.info = info
+        self._on_resumed = on_resumed or (lambda nbytes, fragment: None)
+        # yt-dlp calls the hook for every block/fragment; only forward a few updates per second
+        self._throttle = ProgressThrottle(on_progress or (lambda progress: None), progress_rate)
+        self._cancel_event = threading.Event()
+        self._cleanup_on_cancel = True
+        self._touched_files: Set[str] = set()
+        self._governor = governor
+        self._consumer: Optional[BandwidthConsumer] = None
+        self._bytes_lock = threading.Lock()
+        self._seen_bytes: Dict[str, int] = {}
+        self._on_transferred = on_transferred or (lambda: None)
+        self._postprocess_slots = postprocess_slots
+        self._on_checksum = on_checksum or (lambda path, checksum: None)
+        self._hasher = FollowingHasher()
+
+    def cancel(self, cleanup: bool = True) -> None:
+        """Ask the download to stop at the next progress callback or postprocessor step.
+
+        With ``cleanup`` the partial files are deleted; without it they are kept
+        so the item can be resumed later.
+        """
+        self._cleanup_on_cancel = cleanup
+        self._cancel_event.set()
+
+    def is_cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def _check_cancelled(self) -> None:
+        if self._cancel_event.is_set():
+            raise DownloadCancelled("Download cancelled by user")
+
+    def _hook(self, status: Dict[str, Any]) -> None:
+        for key in ("filename", "tmpfilename"):
+            if status.get(key):
+                self._touched_files.add(status[key])
+        self._check_cancelled()
+
+        if status.get("status") == "downloading":
+            if self._consumer is not None:
+                self._charge_bandwidth(status)
+            self._follow(status)
+            self._throttle.push(DownloadProgress.from_hook(status))
+        elif status.get("status") == "finished":
+            self._follow(status)
+            self._throttle.push(DownloadProgress.from_hook(status), force=True)
+
+    def _follow(self, status: Dict[str, Any]) -> None:
+        """Hash the bytes yt-dlp just appended while they are in the page cache"""
+        # Merged formats end up in a new file anyway; segmented and fragment downloads are
+        # not written front to back and report from several threads, so they are hashed at the end
+        if (
+            (status.get("info_dict") or {}).get("requested_formats") or status.get("segmented")
+            or status.get("fragment_index") is not None or status.get("fragment_count") is not None
+        ):
+            return
+        path = status.get("tmpfilename") or status.get("filename")
+        if path and status.get("downloaded_bytes"):
+            self._hasher.follow(path, int(status["downloaded_bytes"]), final=status.get("status") == "finished")
+
+    def _report_checksums(self, paths: List[str]) -> None:
+        # Not cancellable: the files are complete, and a cancel would delete them
+        for path in paths:
+            try:
+                checksum = self._hasher.checksum(path) or hash_file(path)
+            except OSError:
+                continue  # Moved or removed by a post-processor
+            self._on_checksum(path, checksum)
+
+    def _charge_bandwidth(self, status: Dict[str, Any]) -> None:
+        """Draw the bytes received since the last callback from the shared bandwidth budget.
+
+        Sleeping here stalls yt-dlp's read loop, which is what slows the connection down.
+        The first callback for a file only sets the baseline: its count includes what an
+        earlier attempt left on disk, which was not received now.
+        """
+        key = status.get("tmpfilename") or status.get("filename") or ""
+        downloaded = int(status.get("downloaded_bytes") or 0)
+        with self._bytes_lock:
+            seen = self._seen_bytes.get(key)
+            self._seen_bytes[key] = downloaded
+        if seen is not None:
+            self._consumer.consume(downloaded - seen)
+
+    def _pp_hook(self, status: Dict[str, Any]) -> None:
+        self._check_cancelled()
+        if status.get("status") == "started":
+            info = status.get("info_dict") or {}
+            self._throttle.push(
+                DownloadProgress(
+                    phase="processing",
+                    filename=info.get("filepath"),
+                    postprocessor=status.get("postprocessor"),
+                ),
+                force=True,
+            )
+
+    def _acquire_postprocess_slot(self) -> bool:
+        if self._postprocess_slots is None:
+            return False
+        while not self._postprocess_slots.acquire(timeout=0.2):
+            self._check_cancelled()
+        return True
+
+    def _download(self, ydl: yt_dlp.YoutubeDL) -> None:
+        if self.info is None:
+            ydl.download([self.url])
+            return
+        # Same as yt-dlp's --load-info-json: fall back to a fresh extraction if the info went stale
+        try:
+            ydl.process_ie_result(self.info, download=True)
+        except DownloadError:
+            if self._cancel_event.is_set():
+                raise
+            ydl.download([self.url])
+
+    def run(self) -> None:
+        """Download the URL; raises DownloadCancelled when cancelled, or the yt-dlp error"""
+        options = {
+            **self.ydl_opts,
+            "progress_hooks": [self._hook],
+            "postprocessor_hooks": [self._pp_hook],
+            "quiet": True,
+            "noprogress": True,
+            "logger": SilentLogger(),
+            "ignoreerrors": False,
+            # Keep .part files and fragment journals so an interrupted item can continue later
+            "continuedl": True,
+            "nopart": False,
+        }
+        consumer = self._governor.consumer() if self._governor is not None else None
+        holds_slot = False
+        try:
+            self._check_cancelled()
+            with _DeferredPostProcessYDL(options) as ydl:
+                with consumer or nullcontext():
+                    self._consumer = consumer
+                    ydl.add_post_processor(_ResumeProbePP(self._on_resumed, ydl), when="before_dl")
+                    self._download(ydl)
+                    self._consumer = None
+
+                if ydl.has_deferred_post_processing():
+                    self._throttle.flush()
+                    self._on_transferred()
+                    holds_slot = self._acquire_postprocess_slot()
+                    self._check_cancelled()
+                    ydl.run_deferred_post_processing()
+                self._report_checksums(ydl.final_paths)
+        except Exception:
+            if not self._cancel_event.is_set():
+                raise
+            # The YoutubeDL context is closed here, so no handle keeps the files open
+            if self._cleanup_on_cancel:
+                remove_partial_files(self._touched_files)
+            raise DownloadCancelled("Download cancelled by user")
+        finally:
+            if holds_slot:
+                self._postprocess_slots.release()
+            self._consumer = None
+            self._throttle.flush()
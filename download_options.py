@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from bandwidth_governor import parse_rate
+
+
+DEFAULT_FORMAT = "bestvideo+bestaudio/best"
+# Output of audio-only downloads. Except for "mp3", FFmpeg only re-encodes when the
+# downloaded codec does not fit the target; otherwise the stream is copied
+AUDIO_FORMATS = {
+    "best": "Original codec (no re-encoding)",
+    "original": "Keep downloaded file",
+    "m4a": "M4A (AAC)",
+    "opus": "Opus",
+    "mp3": "MP3",
+}
+DEFAULT_AUDIO_FORMAT = "best"
+AUDIO_SELECTOR = "bestaudio/best"
+# Prefer a source already in the target codec, so it is copied rather than re-encoded
+_AUDIO_SOURCE_SELECTORS = {
+    "m4a": "bestaudio[acodec^=mp4a]/bestaudio/best",
+    "opus": "bestaudio[acodec=opus]/bestaudio/best",
+    "mp3": "bestaudio[acodec=mp3]/bestaudio/best",
+}
+SPONSORBLOCK_DEFAULT_CATEGORIES = ["sponsor", "selfpromo", "interaction", "intro", "outro", "preview", "music_offtopic"]
+
+
+def default_downloads_dir() -> str:
+    home = os.path.expanduser("~")
+    return os.path.join(home, "Downloads")
+
+
+@dataclass
+class DownloadOptions:
+    """User choices that turn into yt-dlp options; shared by the window and the command line."""
+
+    output_dir: Optional[str] = None
+    format: Optional[str] = None  # yt-dlp format selector; None picks the best video and audio
+    audio_only: bool = False  # save only the audio, as audio_format
+    audio_format: str = DEFAULT_AUDIO_FORMAT  # a key of AUDIO_FORMATS
+    subtitles: List[str] = field(default_factory=list)
+    embed_subtitles: bool = False
+    save_thumbnail: bool = False
+    save_description: bool = False
+    sponsorblock: bool = False
+    sponsorblock_categories: Optional[List[str]] = None
+    concurrent_fragments: int = 4  # 0 = tuned per site by the scheduler
+    connections_per_file: int = 1  # range requests at once for progressive (single-file) formats
+    rate_limit: Optional[str] = None  # per download, e.g. "5M"
+    proxy: Optional[str] = None
+    cookies: Optional[str] = None
+    user_agent: Optional[str] = None
+    ffmpeg_location: Optional[str] = None
+    stream_merge: bool = False  # mux "video+audio" formats with one ffmpeg while downloading
+    playlist_title: Optional[str] = None  # entries of one playlist share a folder named after it
+
+
+def build_ydl_opts(options: DownloadOptions) -> Dict[str, Any]:
+    """Build the yt-dlp options for one download item"""
+    import yt_dlp
+
+    base_dir = options.output_dir or default_downloads_dir()
+    if options.playlist_title:
+        folder = yt_dlp.utils.sanitize_filename(options.playlist_title, restricted=False)
+        outtmpl_path = os.path.join(base_dir, folder, "%(title)s.%(ext)s")
+    else:
+        outtmpl_path = os.path.join(base_dir, "%(title)s", "%(title)s.%(ext)s")
+
+    if options.audio_format not in AUDIO_FORMATS:
+        raise ValueError(f"unknown audio format: {options.audio_format}")
+    selector = options.format or DEFAULT_FORMAT
+    if options.audio_only and selector in (DEFAULT_FORMAT, AUDIO_SELECTOR):
+        selector = _AUDIO_SOURCE_SELECTORS.get(options.audio_format, AUDIO_SELECTOR)
+
+    ydl_opts: Dict[str, Any] = {
+        "format": selector,
+        "outtmpl": {"default": outtmpl_path},
+        "noplaylist": True,
+        "postprocessors": [],
+        "writethumbnail": options.save_thumbnail,
+        "writesubtitles": bool(options.subtitles),
+        "subtitleslangs": options.subtitles or ["en"],
+        "embedsubtitles": options.embed_subtitles,
+        "writedescription": options.save_description,
+    }
+
+    # 0 = Auto: the scheduler tunes the fragment concurrency per site
+    if options.concurrent_fragments > 0:
+        ydl_opts["concurrent_fragment_downloads"] = options.concurrent_fragments
+
+    # "embedsubtitles" and "sponsorblock_*" are command-line options that YoutubeDL itself
+    # ignores; they stay in the options for re-downloads from history, while the real work
+    # is done by these post-processors, which run in the pooled post-processing stage
+    if options.sponsorblock:
+        sponsor_categories = options.sponsorblock_categories or SPONSORBLOCK_DEFAULT_CATEGORIES
+        ydl_opts["sponsorblock_mark"] = sponsor_categories
+        ydl_opts["sponsorblock_remove"] = sponsor_categories
+        ydl_opts["postprocessors"].append({"key": "SponsorBlock", "categories": sponsor_categories, "when": "after_filter"})
+        ydl_opts["postprocessors"].append({"key": "ModifyChapters", "remove_sponsor_segments": sponsor_categories})
+
+    # "original" keeps the downloaded file as it is and needs no FFmpeg at all
+    if options.audio_only and options.audio_format != "original":
+        ydl_opts["postprocessors"].append({
+            "key": "FFmpegExtractAudio",
+            "preferredcodec": options.audio_format,
+            "preferredquality": "0",  # highest quality, used only when re-encoding
+        })
+
+    if options.embed_subtitles and options.subtitles and not options.audio_only:
+        ydl_opts["postprocessors"].append({"key": "FFmpegEmbedSubtitle", "already_have_subtitle": False})
+
+    # Read by the download engine, not by YoutubeDL (see segmented_downloader)
+    if options.connections_per_file > 1:
+        ydl_opts["connections_per_file"] = options.connections_per_file
+
+    # Per-download cap; the total cap is enforced by the scheduler's bandwidth governor
+    per_download_rate = parse_rate(options.rate_limit)
+    if per_download_rate:
+        ydl_opts["ratelimit"] = per_download_rate
+
+    if options.proxy:
+        ydl_opts["proxy"] = options.proxy
+    if options.cookies:
+        ydl_opts["cookiefile"] = options.cookies
+    if options.user_agent:
+        ydl_opts["http_headers"] = {"User-Agent": options.user_agent}
+
+    if options.ffmpeg_location:
+        ydl_opts["ffmpeg_location"] = options.ffmpeg_location
+
+    # Read by the download engine, not by YoutubeDL (see stream_merge)
+    if options.stream_merge:
+        ydl_opts["stream_merge"] = True
+
+    return ydl_opts
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+# Default ceiling for progress updates forwarded per download
+PROGRESS_UPDATES_PER_SECOND = 10.0
+
+
+def format_bytes(size: Optional[float]) -> str:
+    """Formats bytes into KB, MB, GB, etc."""
+    if size is None:
+        return "?"
+    for unit in ["B", "KB", "MB", "GB", "TB"]:
+        if abs(size) < 1024.0:
+            return f"{size:.0f}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+        size /= 1024.0
+    return f"{size:.1f}PB"
+
+
+@dataclass
+class DownloadProgress:
+    """Numeric snapshot of a running download, built from yt-dlp's raw hook fields."""
+
+    phase: str  # "downloading", "finished" or "processing"
+    downloaded_bytes: int = 0
+    total_bytes: Optional[int] = None  # exact size or yt-dlp's estimate
+    speed: Optional[float] = None  # bytes per second
+    eta: Optional[int] = None  # seconds
+    fragment_index: Optional[int] = None
+    fragment_count: Optional[int] = None
+    filename: Optional[str] = None
+    elapsed: Optional[float] = None
+    postprocessor: Optional[str] = None
+
+    @classmethod
+    def from_hook(cls, status: Dict[str, Any]) -> DownloadProgress:
+        """Build a record from a yt-dlp progress hook dict without touching its ``_*_str`` fields"""
+        total = status.get("total_bytes") or status.get("total_bytes_estimate")
+        return cls(
+            phase=status.get("status") or "downloading",
+            downloaded_bytes=int(status.get("downloaded_bytes") or 0),
+            total_bytes=int(total) if total else None,
+            speed=status.get("speed"),
+            eta=int(status["eta"]) if status.get("eta") is not None else None,
+            fragment_index=status.get("fragment_index"),
+            fragment_count=status.get("fragment_count"),
+            filename=status.get("filename"),
+            elapsed=status.get("elapsed"),
+        )
+
+    @property
+    def percent(self) -> int:
+        if self.phase in ("finished", "processing"):
+            return 100
+        if self.total_bytes:
+            return max(0, min(100, int(self.downloaded_bytes * 100 / self.total_bytes)))
+        if self.fragment_count:
+            return max(0, min(100, int((self.fragment_index or 0) * 100 / self.fragment_count)))
+        return 0
+
+    def speed_text(self) -> str:
+        return f"{format_bytes(self.speed)}/s" if self.speed else "?"
+
+    def eta_text(self) -> str:
+        if self.eta is None:
+            return "?"
+        mins, secs = divmod(int(self.eta), 60)
+        hours, mins = divmod(mins, 60)
+        return f"{hours}:{mins:02d}:{secs:02d}" if hours else f"{mins:02d}:{secs:02d}"
+
+
+class ProgressThrottle:
+    """Coalesces bursts of progress updates into at most ``max_rate`` emits per second.
+
+    Updates arriving inside the interval replace each other (latest value wins);
+    the newest one is delivered by the next update after the interval or by
+    ``flush``. Safe to call from the concurrent fragment threads of yt-dlp.
+    """
+
+    def __init__(
+        self,
+        emit: Callable[..., None],
+        max_rate: float = PROGRESS_UPDATES_PER_SECOND,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._emit = emit
+        self._interval = 1.0 / max_rate if max_rate > 0 else 0.0
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._last_emit = float("-inf")
+        self._pending: Optional[Tuple[Any, ...]] = None
+
+    def push(self, *args: Any, force: bool = False) -> None:
+        """Offer a new value; it is emitted now or held until the interval passes"""
+        with self._lock:
+            now = self._clock()
+            if not force and now - self._last_emit < self._interval:
+                self._pending = args
+                return
+            self._pending = None
+            self._last_emit = now
+            self._emit(*args)
+
+    def flush(self) -> None:
+        """Emit the held value, if any"""
+        with self._lock:
+            args, self._pending = self._pending, None
+            if args is not None:
+                self._last_emit = self._clock()
+                self._emit(*args)
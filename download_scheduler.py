@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, List, Optional
+
+from PySide6.QtCore import QObject, QTimer, Signal
+
+from batch_runner import BACKEND_PROCESS, BACKEND_THREAD, BatchRunner
+from queue_manager import QueueManager, DownloadItem
+
+__all__ = ["BACKEND_PROCESS", "BACKEND_THREAD", "DownloadScheduler"]
+
+
+class DownloadScheduler(QObject):
+    """Qt front end of a BatchRunner for the window.
+
+    The runner schedules on the GUI thread: its job threads post events
+    through a queued signal, its wakeups run on a QTimer, and its events are
+    re-emitted as the signals below.
+    """
+
+    item_started = Signal(DownloadItem)
+    item_duplicate = Signal(DownloadItem)  # not queued: its video is already queued or running
+    item_progress = Signal(DownloadItem, object)  # item, DownloadProgress
+    item_resumed = Signal(DownloadItem, object)  # item, bytes reused from a partial download
+    batch_progress = Signal(str, int, int, int)  # batch id, finished entries, total entries, percent
+    item_retrying = Signal(DownloadItem, int, float)  # item, attempt, seconds until it starts
+    item_deferred = Signal(DownloadItem, object)  # item, bytes missing on its output volume
+    item_finished = Signal(DownloadItem, bool, str)  # item, ok, message
+    queue_changed = Signal()
+    _posted = Signal(object)  # event from a job thread, delivered on the GUI thread
+
+    def __init__(
+        self, queue_manager: QueueManager, max_concurrent: int = 3, backend: str = BACKEND_THREAD, parent=None
+    ) -> None:
+        super().__init__(parent)
+        self.queue_manager = queue_manager
+        # Wakes the runner when the earliest delayed retry or disk space recheck is due
+        self._wakeup_timer = QTimer(self)
+        self._wakeup_timer.setSingleShot(True)
+        self._posted.connect(self._dispatch)
+        self._runner = BatchRunner(
+            queue_manager,
+            max_concurrent,
+            on_event=self._on_event,
+            backend=backend,
+            post=self._posted.emit,
+            on_wakeup=self._schedule_wakeup,
+        )
+        self._wakeup_timer.timeout.connect(self._runner.pump)
+        self.queue_manager.add_queue_listener(self._on_queue_grew)
+
+    @property
+    def max_concurrent(self) -> int:
+        return self._runner.max_concurrent
+
+    def set_max_concurrent(self, value: int) -> None:
+        self._runner.set_max_concurrent(value)
+
+    def set_batch_limit(self, value: int) -> None:
+        self._runner.set_batch_limit(value)
+
+    def set_speed_limit(self, rate: Optional[float]) -> None:
+        self._runner.set_speed_limit(rate)
+
+    def set_backend(self, backend: str) -> None:
+        self._runner.set_backend(backend)
+
+    def shutdown(self, timeout_ms: int = 3000) -> None:
+        """Stop running downloads but keep them queued, with their partial files, for next start"""
+        self._runner.shutdown(timeout_ms / 1000)
+
+    def submit(self, item: DownloadItem, info: Optional[Dict[str, Any]] = None) -> None:
+        """Queue a download item and start it as soon as a slot is free"""
+        self._runner.submit(item, info)
+
+    def submit_many(self, items: List[DownloadItem]) -> None:
+        self._runner.submit_many(items)
+
+    def resume(self) -> int:
+        """Start items left in the persistent queue by a previous session"""
+        count = self._runner.resume()
+        if count:
+            self.queue_changed.emit()
+        return count
+
+    def cancel(self, item_id: str) -> None:
+        self._runner.cancel(item_id)
+
+    def cancel_all(self) -> None:
+        self._runner.cancel_all()
+
+    def set_priority(self, item_id: str, priority: int) -> None:
+        self._runner.set_priority(item_id, priority)
+
+    def active_items(self) -> List[DownloadItem]:
+        return self._runner.active_items()
+
+    def processing_items(self) -> List[DownloadItem]:
+        return self._runner.processing_items()
+
+    def pending_items(self) -> List[DownloadItem]:
+        return self.queue_manager.get_pending()
+
+    def active_count(self) -> int:
+        return self._runner.active_count()
+
+    def processing_count(self) -> int:
+        return self._runner.processing_count()
+
+    def pending_count(self) -> int:
+        return self._runner.pending_count()
+
+    def is_idle(self) -> bool:
+        return self._runner.is_idle()
+
+    def batch_title(self, batch_id: str) -> Optional[str]:
+        return self._runner.batch_title(batch_id)
+
+    def _dispatch(self, event: tuple) -> None:
+        self._runner.dispatch(event)
+
+    def _on_queue_grew(self) -> None:
+        # Also covers items queued straight into the QueueManager, e.g. retries from the history dialog
+        self.queue_changed.emit()
+        self._runner.pump()
+
+    def _schedule_wakeup(self, at: Optional[float]) -> None:
+        if at is None:
+            self._wakeup_timer.stop()
+        else:
+            self._wakeup_timer.start(max(0, int((at - time.time()) * 1000)))
+
+    def _on_event(self, kind: str, item: DownloadItem, data: Any) -> None:
+        if kind == "started":
+            self.item_started.emit(item)
+        elif kind == "duplicate":
+            self.item_duplicate.emit(item)
+        elif kind == "progress":
+            self.item_progress.emit(item, data)
+        elif kind == "resumed":
+            self.item_resumed.emit(item, data)
+        elif kind == "retrying":
+            self.item_retrying.emit(item, item.attempts, data)
+        elif kind == "deferred":
+            self.item_deferred.emit(item, data)
+        elif kind == "batch":
+            self.batch_progress.emit(item.batch_id, *data)
+        elif kind == "finished":
+            self.item_finished.emit(item, *data)
+        if kind in ("queued", "started", "processing", "retrying", "finished"):
+            self.queue_changed.emit()
@@ -1,9 +1,17 @@
 from typing import Dict, List
 
 from PySide6.QtWidgets import (
-    QDialog, QVBoxLayout, QFormLayout, QSpinBox, QLineEdit, QHBoxLayout, QPushButton, QListWidget, QListWidgetItem, QAbstractItemView
+    QDialog, QVBoxLayout, QFormLayout, QSpinBox, QLineEdit, QHBoxLayout, QPushButton, QListWidget, QListWidgetItem, QAbstractItemView,
+    QComboBox, QCheckBox,
 )
 
+from download_options import AUDIO_FORMATS, DEFAULT_AUDIO_FORMAT
+
+
+DOWNLOAD_BACKENDS = [
+    ("In-app threads", "thread"),
+    ("Separate processes", "process"),
+]
 
 SPONSORBLOCK_CATEGORIES = [
     "sponsor",
@@ -25,11 +33,49 @@ class DownloadSettingsDialog(QDialog):
         form = QFormLayout()
         self.speed_limit = QLineEdit()
         self.concurrent = QSpinBox()
-        self.concurrent.setRange(1, 16)
+        self.concurrent.setRange(0, 16)
+        self.concurrent.setSpecialValueText("Auto")
+        self.concurrent.setToolTip("Auto measures throughput and adjusts the value per site.")
+        self.connections = QSpinBox()
+        self.connections.setRange(1, 16)
+        self.connections.setToolTip(
+            "Splits large single-file formats into byte ranges fetched at the same time, "
+            "for servers that limit the speed of each connection."
+        )
+        self.max_downloads = QSpinBox()
+        self.max_downloads.setRange(1, 16)
+        self.max_downloads.setValue(3)
+        self.playlist_downloads = QSpinBox()
+        self.playlist_downloads.setRange(0, 16)
+        self.playlist_downloads.setSpecialValueText("Same as parallel downloads")
+        self.backend = QComboBox()
+        for label, value in DOWNLOAD_BACKENDS:
+            self.backend.addItem(label, value)
+        self.backend.setToolTip("Separate processes keep the window responsive with many parallel downloads.")
+        self.audio_format = QComboBox()
+        for value, label in AUDIO_FORMATS.items():
+            self.audio_format.addItem(label, value)
+        self.audio_format.setToolTip(
+            "Used for audio-only downloads. Only MP3 always re-encodes; the other choices "
+            "copy the audio stream when the source already has a matching codec."
+        )
+        self.stream_merge = QCheckBox("Merge video and audio while downloading")
+        self.stream_merge.setToolTip(
+            "Pipes both streams into one FFmpeg process and writes only the final file, "
+            "instead of downloading two files and merging them afterwards. "
+            "Not resumable, and not used when a per-download speed limit is set."
+        )
         self.cookies = QLineEdit()
         self.user_agent = QLineEdit()
-        form.addRow("Speed limit (e.g. 5M)", self.speed_limit)
+        self.speed_limit.setToolTip("Shared by all running downloads; leave empty for no limit.")
+        form.addRow("Total speed limit (e.g. 5M)", self.speed_limit)
         form.addRow("Concurrent fragments", self.concurrent)
+        form.addRow("Connections per file", self.connections)
+        form.addRow("Parallel downloads", self.max_downloads)
+        form.addRow("Parallel videos per playlist", self.playlist_downloads)
+        form.addRow("Run downloads in", self.backend)
+        form.addRow("Merging", self.stream_merge)
+        form.addRow("Audio-only format", self.audio_format)
         form.addRow("Cookies file", self.cookies)
         form.addRow("User agent", self.user_agent)
         layout.addLayout(form)
@@ -47,6 +93,25 @@ class DownloadSettingsDialog(QDialog):
                 self.concurrent.setValue(int(current.get("concurrent", 4)))
             except Exception:
                 pass
+            try:
+                self.connections.setValue(int(current.get("connections", 1)))
+            except Exception:
+                pass
+            try:
+                self.max_downloads.setValue(int(current.get("max_downloads", 3)))
+            except Exception:
+                pass
+            try:
+                self.playlist_downloads.setValue(int(current.get("playlist_downloads", 0)))
+            except Exception:
+                pass
+            index = self.backend.findData(current.get("backend", "thread"))
+            if index >= 0:
+                self.backend.setCurrentIndex(index)
+            self.stream_merge.setChecked(current.get("stream_merge") == "1")
+            index = self.audio_format.findData(current.get("audio_format", DEFAULT_AUDIO_FORMAT))
+            if index >= 0:
+                self.audio_format.setCurrentIndex(index)
             self.cookies.setText(current.get("cookies", ""))
             self.user_agent.setText(current.get("user_agent", ""))
             selected = set(current.get("sb_categories", []))
@@ -71,6 +136,12 @@ class DownloadSettingsDialog(QDialog):
         return {
             "speed_limit": self.speed_limit.text().strip(),
             "concurrent": str(self.concurrent.value()),
+            "connections": str(self.connections.value()),
+            "max_downloads": str(self.max_downloads.value()),
+            "playlist_downloads": str(self.playlist_downloads.value()),
+            "backend": self.backend.currentData(),
+            "stream_merge": "1" if self.stream_merge.isChecked() else "0",
+            "audio_format": self.audio_format.currentData(),
             "cookies": self.cookies.text().strip(),
             "user_agent": self.user_agent.text().strip(),
             "sb_categories": cats,
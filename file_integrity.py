@@ -0,0 +1,123 @@
+"""Checksums of downloaded files, computed while the download writes them.
+
+A FollowingHasher reads each stretch of a file right after the downloader
+appended it, while the data is still in the page cache, so a finished
+download has its checksum without another pass over the disk. Files that
+are not written front to back (fragment, segmented and streamed-merge
+downloads) or that post-processing rewrote are hashed once at the end.
+Checksums are stored as ``"<algorithm>:<hex digest>"``.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from typing import Optional, Tuple
+
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+
+# xxh3 hashes at memory speed; SHA-256 is the fallback without the xxhash package
+DEFAULT_ALGORITHM = "xxh3_128" if XXHASH_AVAILABLE else "sha256"
+READ_SIZE = 1024 * 1024
+# Reading behind the writer in larger steps keeps the work per progress callback small
+FOLLOW_STEP = 4 * 1024 * 1024
+
+
+def new_hash(algorithm: str = DEFAULT_ALGORITHM):
+    if algorithm.startswith("xxh"):
+        if not XXHASH_AVAILABLE:
+            raise ValueError(f"{algorithm} checksums need the xxhash package")
+        return getattr(xxhash, algorithm)()
+    return hashlib.new(algorithm)
+
+
+def _file_state(path: str) -> Optional[Tuple[int, int, int]]:
+    """What changes when a file is written or replaced: (inode, size, mtime)"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def hash_file(path: str, algorithm: str = DEFAULT_ALGORITHM) -> str:
+    digest = new_hash(algorithm)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(READ_SIZE), b""):
+            digest.update(block)
+    return f"{algorithm}:{digest.hexdigest()}"
+
+
+def verify_file(path: str, checksum: str) -> bool:
+    """Whether ``path`` still matches a checksum recorded by this module"""
+    algorithm, _, _ = checksum.partition(":")
+    return hash_file(path, algorithm) == checksum
+
+
+class FollowingHasher:
+    """Hashes one file at a time as it grows, from the downloader's progress callbacks.
+
+    ``follow`` reads up to the reported size; a different file restarts the
+    hash. The ``.part`` file and the name it is renamed to count as the same
+    file. Files are opened per read, so the downloader can rename them.
+    Thread-safe: yt-dlp may call progress hooks from several threads.
+    """
+
+    def __init__(self, algorithm: str = DEFAULT_ALGORITHM) -> None:
+        self.algorithm = algorithm
+        self._lock = threading.Lock()
+        self._key: Optional[str] = None
+        self._digest = None
+        self._offset = 0
+        self._state: Optional[Tuple[int, int, int]] = None  # of the file when it was last read
+
+    def reset(self) -> None:
+        with self._lock:
+            self._key = None
+            self._digest = None
+            self._offset = 0
+            self._state = None
+
+    def follow(self, path: str, size: int, final: bool = False) -> None:
+        with self._lock:
+            self._follow(path, size, final)
+
+    def _follow(self, path: str, size: int, final: bool) -> None:
+        key = path[:-len(".part")] if path.endswith(".part") else path
+        if key != self._key:
+            self._key, self._digest, self._offset, self._state = key, new_hash(self.algorithm), 0, None
+        if self._digest is None or size - self._offset < (1 if final else FOLLOW_STEP):
+            return
+        before = _file_state(path)
+        try:
+            with open(path, "rb") as f:
+                f.seek(self._offset)
+                while self._offset < size:
+                    block = f.read(min(READ_SIZE, size - self._offset))
+                    if not block:
+                        break
+                    self._digest.update(block)
+                    self._offset += len(block)
+        except OSError:
+            self._digest = None  # Gave up on this file; checksum() hashes it at the end
+            return
+        after = _file_state(path)
+        # Written to while being read: the hashed bytes may not be the final ones
+        self._state = after if after == before else None
+
+    def checksum(self, path: str) -> Optional[str]:
+        """The followed digest if ``path`` is the followed file, unchanged since it was read to the end"""
+        key = path[:-len(".part")] if path.endswith(".part") else path
+        with self._lock:
+            if key != self._key or self._digest is None or self._state is None:
+                return None
+            state = _file_state(path)
+            # A rename keeps inode, size and mtime; any later rewrite changes at least one of them
+            if state is None or state != (self._state[0], self._offset, self._state[2]):
+                return None
+            return f"{self.algorithm}:{self._digest.hexdigest()}"
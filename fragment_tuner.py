@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+
+# Bounds for concurrent_fragment_downloads in auto mode
+MIN_FRAGMENTS = 1
+MAX_FRAGMENTS = 16
+DEFAULT_FRAGMENTS = 4
+
+# A trial value must beat the current one by this factor to be adopted
+_IMPROVEMENT = 1.05
+# Weight of a new measurement in the running throughput average
+_SMOOTHING = 0.5
+
+
+def host_for_url(url: str) -> str:
+    """Site key used for tuning, e.g. ``youtube.com`` for ``https://m.youtube.com/watch?v=...``"""
+    host = (urlparse(url).hostname or "").lower()
+    for prefix in ("www.", "m.", "music."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    return host
+
+
+class FragmentTuner:
+    """Hill-climbs ``concurrent_fragment_downloads`` per host between downloads.
+
+    Each host keeps the value currently believed best, its measured throughput
+    and a search direction. Downloads alternate between that value and a trial
+    one step away; a trial that is clearly faster becomes the new value, one
+    that is not reverses the direction, and a throttled download (HTTP 429/403)
+    halves the value. The state is saved so the next session starts where this
+    one ended.
+    """
+
+    def __init__(self, state_file: Optional[os.PathLike] = None) -> None:
+        if state_file is None:
+            state_file = Path(os.path.expanduser("~/.ytdownloader")) / "fragment_tuning.json"
+        self.state_file = Path(state_file)
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, Dict[str, Any]] = {}
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self._hosts = {host: state for host, state in data.items() if isinstance(state, dict)}
+        except Exception:
+            self._hosts = {}
+
+    def _save(self) -> None:
+        try:
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.state_file.with_suffix(".tmp")
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(self._hosts, f, indent=2)
+            os.replace(tmp_file, self.state_file)
+        except Exception:
+            pass
+
+    def _state(self, host: str) -> Dict[str, Any]:
+        return self._hosts.setdefault(
+            host, {"value": DEFAULT_FRAGMENTS, "throughput": None, "direction": 1, "trial": False}
+        )
+
+    @staticmethod
+    def _step(value: int) -> int:
+        return max(1, value // 4)
+
+    def suggest(self, url: str) -> int:
+        """Fragment concurrency to use for the next download of ``url``"""
+        host = host_for_url(url)
+        with self._lock:
+            state = self._state(host)
+            value = int(state["value"])
+            if state["throughput"] is None or not state["trial"]:
+                # Measure the current value before (and between) trials
+                state["trial"] = state["throughput"] is not None
+                return value
+            state["trial"] = False
+            candidate = value + state["direction"] * self._step(value)
+            if not MIN_FRAGMENTS <= candidate <= MAX_FRAGMENTS:
+                state["direction"] = -state["direction"]
+                candidate = value + state["direction"] * self._step(value)
+            return max(MIN_FRAGMENTS, min(MAX_FRAGMENTS, candidate))
+
+    def record(self, url: str, fragments: int, throughput: float) -> None:
+        """Feed back the average throughput (bytes/s) of a finished fragmented download"""
+        if throughput <= 0:
+            return
+        host = host_for_url(url)
+        with self._lock:
+            state = self._state(host)
+            value = int(state["value"])
+            best = state["throughput"]
+            if fragments == value or best is None:
+                state["value"] = fragments
+                state["throughput"] = (
+                    throughput if best is None or fragments != value
+                    else best + _SMOOTHING * (throughput - best)
+                )
+            elif throughput > best * _IMPROVEMENT:
+                state["direction"] = 1 if fragments > value else -1
+                state["value"] = fragments
+                state["throughput"] = throughput
+            else:
+                state["direction"] = -1 if fragments > value else 1
+            self._save()
+
+    def record_throttled(self, url: str, fragments: int) -> None:
+        """Back off after the site rejected a download with too many connections"""
+        host = host_for_url(url)
+        with self._lock:
+            state = self._state(host)
+            state["value"] = max(MIN_FRAGMENTS, min(int(state["value"]), fragments) // 2)
+            state["throughput"] = None
+            state["direction"] = -1
+            state["trial"] = False
+            self._save()
+
+
+class TuningSample:
+    """Throughput of one auto-tuned download, fed back to the FragmentTuner when it ends."""
+
+    def __init__(self, url: str, fragments: int) -> None:
+        self.url = url
+        self.fragments = fragments
+        self.fragmented = False
+        self.bytes = 0
+        self.seconds = 0.0
+
+    def observe(self, progress) -> None:
+        """Account for a DownloadProgress record of the download"""
+        if progress.fragment_count:
+            self.fragmented = True
+        if progress.phase == "finished" and progress.total_bytes and progress.elapsed:
+            self.bytes += progress.total_bytes
+            self.seconds += progress.elapsed
+
+    def report(self, tuner: FragmentTuner, ok: bool, error: Optional[str], skewed: bool = False) -> None:
+        """Feed the outcome back; ``skewed`` marks runs whose speed says nothing about the value"""
+        if not ok:
+            if error and any(code in error for code in ("429", "403", "Too Many Requests")):
+                tuner.record_throttled(self.url, self.fragments)
+            return
+        if self.fragmented and not skewed and self.seconds >= 1.0:
+            tuner.record(self.url, self.fragments, self.bytes / self.seconds)
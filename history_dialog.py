@@ -23,6 +23,7 @@ from PySide6.QtWidgets import (
 from PySide6.QtGui import QAction
 
 from queue_manager import QueueManager, DownloadItem, DownloadStatus
+from ytdl_worker import VerifyWorker
 
 
 class HistoryDialog(QDialog):
@@ -35,6 +36,7 @@ class HistoryDialog(QDialog):
         self.setWindowTitle("Download History")
         self.setMinimumSize(900, 600)
         
+        self.verify_worker: Optional[VerifyWorker] = None
         self.setup_ui()
         self.refresh_timer = QTimer()
         self.refresh_timer.timeout.connect(self.refresh_table)
@@ -239,6 +241,12 @@ class HistoryDialog(QDialog):
         open_folder_action.triggered.connect(lambda: self.open_output_folder(download_item.output_path))
         menu.addAction(open_folder_action)
         
+        if download_item.checksum and download_item.file_path:
+            verify_action = QAction("Verify File", self)
+            verify_action.setEnabled(self.verify_worker is None)
+            verify_action.triggered.connect(lambda: self.verify_file(download_item))
+            menu.addAction(verify_action)
+        
         if download_item.error_message:
             show_error_action = QAction("Show Error", self)
             show_error_action.triggered.connect(lambda: self.show_error(download_item.error_message))
@@ -372,6 +380,25 @@ class HistoryDialog(QDialog):
             else:  # Linux
                 subprocess.run(["xdg-open", folder_path])
     
+    def verify_file(self, item: DownloadItem):
+        """Check the downloaded file against the checksum recorded while downloading"""
+        self.verify_worker = VerifyWorker(item.file_path, item.checksum)
+        self.verify_worker.done.connect(lambda ok, message: self.on_verify_done(item, ok, message))
+        # done arrives before run() returns; the reference must outlive the thread
+        self.verify_worker.finished.connect(self.on_verify_finished)
+        self.verify_worker.start()
+    
+    def on_verify_finished(self):
+        if self.verify_worker is not None:
+            self.verify_worker.deleteLater()
+            self.verify_worker = None
+    
+    def on_verify_done(self, item: DownloadItem, ok: bool, message: str):
+        if ok:
+            QMessageBox.information(self, "File Verified", f"{item.file_path}\n\n{message}")
+        else:
+            QMessageBox.warning(self, "Verification Failed", f"{item.file_path}\n\n{message}")
+    
     def show_error(self, error_message: str):
         """Show error message in a dialog"""
         QMessageBox.information(self, "Error Details", error_message)
@@ -1,5 +1,6 @@
 import sys
 import os
+import multiprocessing
 from PySide6.QtWidgets import QApplication
 from PySide6.QtGui import QIcon
 from PySide6.QtCore import QTimer
@@ -8,6 +9,8 @@ from update_dialog import UpdateNotifier
 
 
 def main():
+    # Required for the process download backend in frozen (PyInstaller) builds
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     
     # Set application icon for taskbar - try multiple approaches
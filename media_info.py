@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+import yt_dlp
+
+from download_archive import archive_key_for_url
+from probe_service import ProbeService, default_probe_service
+
+if TYPE_CHECKING:
+    from metadata_cache import MetadataCache
+
+
+class SilentLogger:
+    """yt-dlp logger that drops messages; errors still reach the caller as exceptions"""
+
+    def debug(self, msg: str) -> None:
+        pass
+
+    def info(self, msg: str) -> None:
+        pass
+
+    def warning(self, msg: str) -> None:
+        pass
+
+    def error(self, msg: str) -> None:
+        pass
+
+
+def extract_url_metadata(
+    url: str,
+    playlist: bool = False,
+    cache: Optional[MetadataCache] = None,
+    refresh: bool = False,
+    service: Optional[ProbeService] = None,
+) -> Optional[Dict[str, Any]]:
+    """Extract info for a URL; with ``playlist`` the entries are listed without resolving each video.
+
+    Single videos are looked up in ``cache`` by their id first, unless
+    ``refresh`` asks for a new extraction; with ``playlist`` too, since a
+    video URL resolves to the same info either way. Playlists are never
+    cached, since their entries change. Raises yt-dlp's error when the
+    extraction fails.
+    """
+    key = archive_key_for_url(url) if cache is not None else None
+    if key and not refresh:
+        info = cache.get(key)
+        if info is not None:
+            return info
+
+    info = (service or default_probe_service()).extract(url, playlist=playlist)
+    # A playlist URL with a video id can still resolve to a playlist
+    if key and info and not is_playlist_info(info):
+        cache.put(key, yt_dlp.YoutubeDL.sanitize_info(info))
+    return info
+
+
+def probe_url_metadata(
+    url: str,
+    playlist: bool = False,
+    cache: Optional[MetadataCache] = None,
+    refresh: bool = False,
+) -> Optional[Dict[str, Any]]:
+    """Same as extract_url_metadata, but returns None when the extraction fails"""
+    try:
+        return extract_url_metadata(url, playlist, cache, refresh)
+    except Exception:
+        return None
+
+
+def is_playlist_info(info: Dict[str, Any]) -> bool:
+    return info.get("_type") in ("playlist", "multi_video")
+
+
+def list_playlist_entries(info: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Flatten the entries of a playlist/channel info dict into downloadable items"""
+    result: List[Dict[str, Any]] = []
+    for entry in info.get("entries") or []:
+        if not entry:
+            continue
+        if is_playlist_info(entry):
+            # Channels nest their tabs (videos, shorts, ...) as playlists
+            result.extend(list_playlist_entries(entry))
+            continue
+        url = entry.get("webpage_url") or entry.get("url")
+        if not url:
+            continue
+        thumbs = entry.get("thumbnails") or []
+        result.append(
+            {
+                "url": url,
+                "id": entry.get("id"),
+                "ie_key": entry.get("ie_key"),
+                "title": entry.get("title") or url,
+                "uploader": entry.get("uploader") or entry.get("channel") or info.get("uploader") or info.get("channel"),
+                "duration": entry.get("duration"),
+                "thumbnail": thumbs[-1].get("url") if thumbs else entry.get("thumbnail"),
+            }
+        )
+    return result
+
+
+def list_formats(info: Dict[str, Any]) -> List[Dict[str, Any]]:
+    result: List[Dict[str, Any]] = []
+    for f in info.get("formats", []) or []:
+        result.append(
+            {
+                "format_id": f.get("format_id"),
+                "ext": f.get("ext"),
+                "width": f.get("width"),
+                "height": f.get("height"),
+                "resolution": f.get("resolution") or f"{f.get('width','?')}x{f.get('height','?')}",
+                "fps": f.get("fps"),
+                "vcodec": f.get("vcodec"),
+                "acodec": f.get("acodec"),
+                "abr": f.get("abr"),
+                "filesize": f.get("filesize"),
+                "filesize_approx": f.get("filesize_approx"),
+                "format_note": f.get("format_note"),
+            }
+        )
+    return result
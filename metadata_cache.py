@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, Optional
+
+
+# Format URLs in an info dict are signed and expire after a few hours; a stale
+# one only costs a fresh extraction, since downloads fall back to re-extracting
+CACHE_TTL_SECONDS = 60 * 60
+# Compressed size of all cached info dicts; least recently used ones go first
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+
+
+class MetadataCache:
+    """Info dicts of probed videos, stored compressed in SQLite, keyed by archive key.
+
+    Entries expire after ``ttl`` seconds; once the compressed total exceeds
+    ``max_bytes`` the least recently used entries are evicted. Thread-safe.
+    """
+
+    def __init__(
+        self,
+        path: os.PathLike,
+        ttl: float = CACHE_TTL_SECONDS,
+        max_bytes: int = MAX_CACHE_BYTES,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS info ("
+            " key TEXT PRIMARY KEY, stored_at REAL, used_at REAL, size INTEGER, data BLOB"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS info_used_at ON info (used_at)")
+        self._conn.commit()
+
+    def get(self, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        """The cached info dict for ``key`` unless it is missing or expired"""
+        if not key:
+            return None
+        now = self._clock()
+        with self._lock:
+            row = self._conn.execute("SELECT stored_at, data FROM info WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[0] > self.ttl:
+                self._conn.execute("DELETE FROM info WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE info SET used_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        try:
+            return json.loads(zlib.decompress(row[1]))
+        except Exception:
+            return None  # Written by an incompatible version; the next put replaces it
+
+    def put(self, key: Optional[str], info: Dict[str, Any]) -> None:
+        if not key:
+            return
+        try:
+            data = zlib.compress(json.dumps(info, default=str).encode("utf-8"), 6)
+        except (TypeError, ValueError):
+            return
+        if len(data) > self.max_bytes:
+            return
+        now = self._clock()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO info (key, stored_at, used_at, size, data) VALUES (?, ?, ?, ?, ?)",
+                (key, now, now, len(data), data),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM info WHERE stored_at < ?", (now - self.ttl,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM info").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM info ORDER BY used_at").fetchall()
+        doomed = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM info WHERE key = ?", doomed)
+
+    def invalidate(self, key: Optional[str]) -> None:
+        if not key:
+            return
+        with self._lock:
+            self._conn.execute("DELETE FROM info WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM info")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
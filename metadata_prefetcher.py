@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import yt_dlp
+
+from media_info import SilentLogger
+from queue_manager import DownloadItem
+
+
+# Media URLs in an info dict expire (hours on YouTube); older prefetches are re-extracted
+PREFETCH_MAX_AGE = 30 * 60
+# A failed extraction is retried after this delay, doubled per failure, and not after the last attempt;
+# the download itself still extracts, and reports the error, when the item starts
+PREFETCH_RETRY_DELAY = 60.0
+PREFETCH_MAX_ATTEMPTS = 3
+
+
+def resolve_info(url: str, ydl_opts: Dict[str, Any]) -> Dict[str, Any]:
+    """Extract the info dict a download of ``url`` with ``ydl_opts`` would use, as plain JSON data"""
+    options = {
+        **ydl_opts,
+        "quiet": True,
+        "no_warnings": True,
+        "noprogress": True,
+        "logger": SilentLogger(),
+        "skip_download": True,
+        # Post-processors run with the download; probing them here would only repeat work
+        "postprocessors": [],
+    }
+    with yt_dlp.YoutubeDL(options) as ydl:
+        info = ydl.extract_info(url, download=False)
+    return prepare_info(info)
+
+
+def prepare_info(info: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduce an info dict to the JSON-safe form yt-dlp writes with --write-info-json"""
+    return yt_dlp.YoutubeDL.sanitize_info(dict(info), remove_private_keys=True)
+
+
+class MetadataPrefetcher:
+    """Resolves info dicts for upcoming queue items while earlier items download.
+
+    Extraction (webpage, player and API requests) is the slow first phase of
+    every download. Doing it ahead on a small thread pool lets a download
+    start transferring as soon as a slot frees up. Qt-free; results are
+    picked up with ``take`` from whichever thread starts the download.
+    Items whose extraction failed are skipped until their backoff expires.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        max_age: float = PREFETCH_MAX_AGE,
+        retry_delay: float = PREFETCH_RETRY_DELAY,
+        max_attempts: int = PREFETCH_MAX_ATTEMPTS,
+    ) -> None:
+        self.max_age = max_age
+        self.retry_delay = retry_delay
+        self.max_attempts = max_attempts
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self._running: Dict[str, Future] = {}
+        self._ready: Dict[str, Dict[str, Any]] = {}
+        self._failures: Dict[str, Tuple[int, float]] = {}  # item id -> (failed attempts, retry after)
+        self._closed = False
+
+    def prefetch(self, items: Iterable[DownloadItem]) -> None:
+        """Start resolving the given items unless already done or in progress"""
+        now = time.monotonic()
+        started = []
+        with self._lock:
+            if self._closed:
+                return
+            for item in items:
+                if item.id in self._running or item.id in self._ready:
+                    continue
+                attempts, retry_after = self._failures.get(item.id, (0, 0.0))
+                if attempts >= self.max_attempts or now < retry_after:
+                    continue
+                future = self._executor.submit(resolve_info, item.url, item.options)
+                self._running[item.id] = future
+                started.append((item.id, future))
+        # A future that is already done runs its callback right here, which takes the lock
+        for item_id, future in started:
+            future.add_done_callback(lambda f, item_id=item_id: self._on_resolved(item_id, f))
+
+    def seed(self, item: DownloadItem, info: Dict[str, Any]) -> None:
+        """Reuse an info dict that was already extracted, e.g. when the user analyzed the URL"""
+        with self._lock:
+            if not self._closed and info:
+                self._ready[item.id] = prepare_info(info)
+
+    def _on_resolved(self, item_id: str, future: Future) -> None:
+        with self._lock:
+            # Dropped by take/discard in the meantime: nobody wants the result any more
+            if self._running.pop(item_id, None) is not future:
+                return
+            if future.cancelled():
+                return
+            if future.exception() is None:
+                self._ready[item_id] = future.result()
+                self._failures.pop(item_id, None)
+            else:
+                attempts = self._failures.get(item_id, (0, 0.0))[0] + 1
+                delay = self.retry_delay * 2 ** (attempts - 1)
+                self._failures[item_id] = (attempts, time.monotonic() + delay)
+
+    def take(self, item_id: str) -> Optional[Dict[str, Any]]:
+        """Hand over the prefetched info for an item that is starting now, if it is fresh.
+
+        An extraction still in progress is abandoned rather than waited for;
+        the download then extracts on its own.
+        """
+        with self._lock:
+            future = self._running.pop(item_id, None)
+            if future is not None:
+                future.cancel()
+            info = self._ready.pop(item_id, None)
+            self._failures.pop(item_id, None)
+        if info is None or time.time() - info.get("epoch", 0) > self.max_age:
+            return None
+        return info
+
+    def peek(self, item_id: str) -> Optional[Dict[str, Any]]:
+        """The prefetched info for an item, left in place for ``take``"""
+        with self._lock:
+            return self._ready.get(item_id)
+
+    def discard(self, item_id: str) -> None:
+        self.take(item_id)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._closed = True
+            futures = list(self._running.values())
+            self._running.clear()
+            self._ready.clear()
+            self._failures.clear()
+        for future in futures:
+            future.cancel()
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,102 @@
+"""Reusable YoutubeDL instances for metadata probes.
+
+Creating a YoutubeDL loads the extractor list, sets up the cookie jar and
+the request handlers, and every extractor it then uses is initialized on
+first use; its HTTP connections are closed with it. ProbeService keeps a
+few instances alive between probes so that this work, and open connections
+to the sites just probed, carry over to the next call. An instance is used
+by one thread at a time: a probe checks one out and returns it afterwards.
+"""
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import yt_dlp
+
+
+# Idle instances kept per kind of probe; more are created under load and closed after use
+PROBE_POOL_SIZE = 2
+# Matched by no site extractor, so warming up asks every one of them
+WARM_UP_URL = "https://warm-up.invalid/"
+
+
+def probe_options(playlist: bool) -> Dict[str, Any]:
+    """Options of a probe; with ``playlist`` the entries are listed without resolving each video"""
+    options: Dict[str, Any] = {"quiet": True, "skip_download": True, "noplaylist": not playlist}
+    if playlist:
+        options["extract_flat"] = "in_playlist"
+    return options
+
+
+class ProbeService:
+    """Pool of warm YoutubeDL instances for extracting info without downloading. Thread-safe."""
+
+    def __init__(
+        self,
+        pool_size: int = PROBE_POOL_SIZE,
+        factory: Callable[[Dict[str, Any]], yt_dlp.YoutubeDL] = yt_dlp.YoutubeDL,
+    ) -> None:
+        self.pool_size = pool_size
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._idle: Dict[bool, List[yt_dlp.YoutubeDL]] = {False: [], True: []}
+        self._closed = False
+
+    @contextmanager
+    def _checkout(self, playlist: bool) -> Iterator[yt_dlp.YoutubeDL]:
+        with self._lock:
+            idle = self._idle[playlist]
+            ydl = idle.pop() if idle else None
+        if ydl is None:
+            ydl = self._factory(probe_options(playlist))
+        try:
+            yield ydl
+        finally:
+            with self._lock:
+                keep = not self._closed and len(self._idle[playlist]) < self.pool_size
+                if keep:
+                    self._idle[playlist].append(ydl)
+            if not keep:
+                ydl.close()
+
+    def extract(self, url: str, playlist: bool = False) -> Optional[Dict[str, Any]]:
+        """Info for ``url`` as YoutubeDL.extract_info returns it; raises the extraction error"""
+        with self._checkout(playlist) as ydl:
+            return ydl.extract_info(url, download=False)
+
+    def warm_up(self) -> None:
+        """Do the first probe's local work ahead of time, e.g. from a background thread at startup"""
+        from yt_dlp.extractor import gen_extractor_classes
+
+        with self._checkout(False):
+            pass
+        # Matching a URL compiles the URL pattern of every extractor that is asked;
+        # compiled once per process, and the bulk of a cold probe's CPU time
+        for ie in gen_extractor_classes():
+            try:
+                ie.suitable(WARM_UP_URL)
+            except Exception:
+                pass
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            instances = self._idle[False] + self._idle[True]
+            self._idle = {False: [], True: []}
+        for ydl in instances:
+            ydl.close()
+
+
+_default_service: Optional[ProbeService] = None
+_default_lock = threading.Lock()
+
+
+def default_probe_service() -> ProbeService:
+    """The probe service shared by every metadata probe in this process"""
+    global _default_service
+    with _default_lock:
+        if _default_service is None:
+            _default_service = ProbeService()
+        return _default_service
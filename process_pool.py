@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+import multiprocessing
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from download_progress import DownloadProgress, PROGRESS_UPDATES_PER_SECOND
+
+
+# Seconds between checks for a cancel request while a job runs in the child
+_CONTROL_POLL_INTERVAL = 0.05
+
+
+def _serve_jobs(control, events, governor, postprocess_slots) -> None:
+    """Child process loop: run download jobs one at a time and stream their events back.
+
+    ``control`` carries ('job', url, opts, rate, info), ('cancel', cleanup) and
+    ('stop',) from the parent; ``events`` carries ('progress', DownloadProgress),
+    ('resumed', bytes, fragment), ('transferred',), ('checksum', path, checksum),
+    ('error', message) and
+    ('done', ok, message). ``governor`` and ``postprocess_slots`` are shared
+    with the parent and the other pool processes.
+    """
+    # Imported here so the parent only pays for yt-dlp in the children
+    from yt_dlp.utils import DownloadCancelled
+    from download_engine import DownloadJob
+
+    send_lock = threading.Lock()
+
+    def send(*message: Any) -> None:
+        with send_lock:
+            events.send(message)
+
+    next_message = None
+    while True:
+        try:
+            message, next_message = next_message or control.recv(), None
+        except (EOFError, OSError):
+            return
+        if message[0] == "stop":
+            return
+        if message[0] != "job":
+            continue  # A cancel that arrived after its job finished
+
+        _, url, ydl_opts, progress_rate, info = message
+        job = DownloadJob(
+            url,
+            ydl_opts,
+            on_progress=lambda progress: send("progress", progress),
+            on_resumed=lambda nbytes, fragment: send("resumed", nbytes, fragment),
+            progress_rate=progress_rate,
+            governor=governor,
+            on_transferred=lambda: send("transferred"),
+            postprocess_slots=postprocess_slots,
+            info=info,
+            on_checksum=lambda path, checksum: send("checksum", path, checksum),
+        )
+
+        def run_job() -> None:
+            try:
+                job.run()
+                send("done", True, "Download complete.")
+            except DownloadCancelled:
+                send("done", False, "Download cancelled.")
+            except Exception as exc:
+                send("error", str(exc))
+                send("done", False, "Download failed.")
+
+        runner = threading.Thread(target=run_job, daemon=True)
+        runner.start()
+        while runner.is_alive():
+            if control.poll(_CONTROL_POLL_INTERVAL):
+                try:
+                    request = control.recv()
+                except (EOFError, OSError):
+                    job.cancel(cleanup=False)
+                    runner.join()
+                    return
+                if request[0] == "cancel":
+                    job.cancel(cleanup=request[1])
+                elif request[0] == "stop":
+                    # Parent is shutting down: keep partial files for a later resume
+                    job.cancel(cleanup=False)
+                    runner.join()
+                    return
+                elif request[0] == "job":
+                    # The parent saw 'done' before this thread exited and already sent more work
+                    next_message = request
+
+
+class PooledProcess:
+    """A long-lived download process and the two pipes used to talk to it."""
+
+    def __init__(self, context, governor=None, postprocess_slots=None) -> None:
+        control_recv, self._control = context.Pipe(duplex=False)
+        self._events, events_send = context.Pipe(duplex=False)
+        self._send_lock = threading.Lock()
+        self.process = context.Process(
+            target=_serve_jobs, args=(control_recv, events_send, governor, postprocess_slots), daemon=True
+        )
+        self.process.start()
+        # The child owns these ends now
+        control_recv.close()
+        events_send.close()
+
+    def is_alive(self) -> bool:
+        return self.process.is_alive()
+
+    def _send(self, *message: Any) -> None:
+        with self._send_lock:
+            self._control.send(message)
+
+    def run_job(
+        self,
+        url: str,
+        ydl_opts: Dict[str, Any],
+        progress_rate: float,
+        on_event: Callable[[Tuple[Any, ...]], None],
+        on_started: Optional[Callable[[], None]] = None,
+        info: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[bool, str]:
+        """Run a job in the child, forwarding every event; returns the final (ok, message).
+
+        ``on_started`` runs once the job has been handed to the child, i.e. from
+        the point where ``cancel`` can reach it.
+        """
+        self._send("job", url, ydl_opts, progress_rate, info)
+        if on_started is not None:
+            on_started()
+        while True:
+            try:
+                event = self._events.recv()
+            except (EOFError, OSError):
+                raise RuntimeError("Download process exited unexpectedly")
+            if event[0] == "done":
+                return event[1], event[2]
+            on_event(event)
+
+    def cancel(self, cleanup: bool = True) -> None:
+        try:
+            self._send("cancel", cleanup)
+        except (OSError, ValueError):
+            pass
+
+    def stop(self, timeout: float = 2.0) -> None:
+        try:
+            self._send("stop")
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+class DownloadProcessPool:
+    """Pool of worker processes so yt-dlp runs outside the GUI interpreter and its GIL.
+
+    Processes are spawned on demand up to ``max_processes`` and reused across
+    jobs; a process that dies is replaced on the next acquire.
+    """
+
+    def __init__(self, max_processes: int = 3, governor=None, postprocess_slots=None) -> None:
+        # spawn: forking a process that already runs Qt threads is unsafe
+        self._context = multiprocessing.get_context("spawn")
+        self._governor = governor
+        self._postprocess_slots = postprocess_slots
+        self._max_processes = max(1, int(max_processes))
+        self._lock = threading.Condition()
+        self._idle: List[PooledProcess] = []
+        self._busy: List[PooledProcess] = []
+
+    def set_max_processes(self, value: int) -> None:
+        with self._lock:
+            self._max_processes = max(1, int(value))
+            while self._idle and len(self._idle) + len(self._busy) > self._max_processes:
+                self._idle.pop().stop()
+            self._lock.notify_all()
+
+    def acquire(self, timeout: Optional[float] = None) -> PooledProcess:
+        """Take an idle process, starting one if the pool is not full yet"""
+        with self._lock:
+            while True:
+                while self._idle:
+                    proc = self._idle.pop()
+                    if proc.is_alive():
+                        self._busy.append(proc)
+                        return proc
+                if len(self._busy) < self._max_processes:
+                    proc = PooledProcess(self._context, self._governor, self._postprocess_slots)
+                    self._busy.append(proc)
+                    return proc
+                if not self._lock.wait(timeout):
+                    raise TimeoutError("No download process became available")
+
+    def release(self, proc: PooledProcess) -> None:
+        """Return a process after its job finished; dead processes are dropped"""
+        with self._lock:
+            if proc in self._busy:
+                self._busy.remove(proc)
+            if proc.is_alive() and len(self._idle) + len(self._busy) < self._max_processes:
+                self._idle.append(proc)
+            else:
+                proc.stop(timeout=0)
+            self._lock.notify()
+
+    def close(self) -> None:
+        """Stop every process; running jobs keep their partial files"""
+        with self._lock:
+            procs = self._idle + self._busy
+            self._idle, self._busy = [], []
+        for proc in procs:
+            proc.stop()
+
+
+class PooledJob:
+    """One download run in a process from a DownloadProcessPool, with DownloadJob's interface.
+
+    ``run`` blocks the calling thread until the child reports the result and
+    raises like DownloadJob.run; the callbacks are invoked on that thread.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        ydl_opts: Dict[str, Any],
+        pool: DownloadProcessPool,
+        on_progress: Optional[Callable[[DownloadProgress], None]] = None,
+        on_resumed: Optional[Callable[[int, int], None]] = None,
+        progress_rate: float = PROGRESS_UPDATES_PER_SECOND,
+        on_transferred: Optional[Callable[[], None]] = None,
+        info: Optional[Dict[str, Any]] = None,
+        on_checksum: Optional[Callable[[str, str], None]] = None,
+    ) -> None:
+        self.url = url
+        self.ydl_opts = {**ydl_opts}
+        self.info = info
+        self._pool = pool
+        self._progress_rate = progress_rate
+        self._on_progress = on_progress or (lambda progress: None)
+        self._on_resumed = on_resumed or (lambda nbytes, fragment: None)
+        self._on_transferred = on_transferred or (lambda: None)
+        self._on_checksum = on_checksum or (lambda path, checksum: None)
+        self._lock = threading.Lock()
+        self._proc: Optional[PooledProcess] = None
+        self._cancel_request: Optional[bool] = None  # cleanup flag once cancel() was called
+        self._error: Optional[str] = None
+
+    def cancel(self, cleanup: bool = True) -> None:
+        with self._lock:
+            self._cancel_request = cleanup
+            if self._proc is not None:
+                self._proc.cancel(cleanup)
+
+    def is_cancelled(self) -> bool:
+        return self._cancel_request is not None
+
+    def _on_event(self, event: Tuple[Any, ...]) -> None:
+        kind = event[0]
+        if kind == "progress":
+            self._on_progress(event[1])
+        elif kind == "resumed":
+            self._on_resumed(event[1], event[2])
+        elif kind == "transferred":
+            self._on_transferred()
+        elif kind == "checksum":
+            self._on_checksum(event[1], event[2])
+        elif kind == "error":
+            self._error = event[1]
+
+    def run(self) -> None:
+        """Download in a pool process; raises DownloadCancelled when cancelled, or the child's error"""
+        from yt_dlp.utils import DownloadCancelled
+
+        if self._cancel_request is not None:
+            raise DownloadCancelled("Download cancelled by user")
+        proc = None
+
+        def on_started() -> None:
+            with self._lock:
+                self._proc = proc
+                pending_cancel = self._cancel_request
+            # A cancel that arrived while the job was being handed over
+            if pending_cancel is not None:
+                proc.cancel(pending_cancel)
+
+        try:
+            proc = self._pool.acquire()
+            ok, message = proc.run_job(
+                self.url, self.ydl_opts, self._progress_rate, self._on_event, on_started, self.info
+            )
+        finally:
+            with self._lock:
+                self._proc = None
+            if proc is not None:
+                self._pool.release(proc)
+        if ok:
+            return
+        if self._cancel_request is not None:
+            raise DownloadCancelled("Download cancelled by user")
+        raise RuntimeError(self._error or message)
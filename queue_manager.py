@@ -2,16 +2,30 @@ from __future__ import annotations
 
 import json
 import os
+import uuid
 from datetime import datetime
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 from enum import Enum
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Iterator, Optional, Set, Tuple
 from pathlib import Path
 
+from download_archive import DownloadArchive, archive_key_for_url
+from fragment_tuner import host_for_url
+
+
+# Queue priorities; higher values start first
+PRIORITY_LOW = -10
+PRIORITY_NORMAL = 0
+PRIORITY_HIGH = 10  # interactive requests, e.g. a single URL from the window
+# Download slots on top of the concurrency limit that only PRIORITY_HIGH items may use,
+# so an interactive request starts within seconds even when a big batch fills every slot
+INTERACTIVE_SLOTS = 1
+
 
 class DownloadStatus(Enum):
     PENDING = "pending"
     DOWNLOADING = "downloading"
+    PROCESSING = "processing"  # transfer done, waiting for or running post-processing
     COMPLETED = "completed"
     FAILED = "failed"
     CANCELLED = "cancelled"
@@ -34,6 +48,16 @@ class DownloadItem:
     error_message: Optional[str] = None
     file_size: Optional[int] = None
     download_speed: Optional[str] = None
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    resumed_bytes: Optional[int] = None  # bytes reused from a previous attempt
+    batch_id: Optional[str] = None  # shared by the entries of one playlist/channel
+    batch_title: Optional[str] = None
+    archive_key: Optional[str] = None  # "extractor id", recorded in the archive on completion
+    attempts: int = 0  # automatic retries made so far
+    retry_at: Optional[float] = None  # epoch seconds before which a retried item must not start
+    priority: int = PRIORITY_NORMAL
+    file_path: Optional[str] = None  # the finished file
+    checksum: Optional[str] = None  # "<algorithm>:<hex digest>" of file_path, see file_integrity
     
     def to_dict(self) -> Dict[str, Any]:
         data = asdict(self)
@@ -57,6 +81,20 @@ class DownloadItem:
         return cls(**data)
 
 
+def video_keys(item: DownloadItem) -> Tuple[str, ...]:
+    """What identifies the video of an item in the work queue: its URL and, if known, its archive key"""
+    return (item.url, item.archive_key) if item.archive_key else (item.url,)
+
+
+def fair_share_key(item: DownloadItem) -> str:
+    """Group whose items take turns with other groups: the playlist/batch, else the channel, else the site"""
+    if item.batch_id:
+        return item.batch_id
+    if item.uploader and item.uploader != "Unknown":
+        return f"uploader:{item.uploader}"
+    return f"host:{host_for_url(item.url)}"
+
+
 class QueueManager:
     def __init__(self, data_dir: Optional[str] = None):
         if data_dir is None:
@@ -66,10 +104,21 @@ class QueueManager:
         self.data_dir.mkdir(parents=True, exist_ok=True)
         
         self.history_file = self.data_dir / "history.json"
+        self.queue_file = self.data_dir / "queue.jsonl"
+        # Every finished download, unlike the history which keeps only the last 100
+        self.archive = DownloadArchive(self.data_dir / "archive.sqlite3")
         
         self.history: List[DownloadItem] = []
+        # Live work queue (pending and in-progress items), in submission order
+        self.queue: Dict[str, DownloadItem] = {}
+        self._journal_lines = 0
+        # Fair-share group -> sequence number of its most recent start, for round-robin
+        self._served: Dict[str, int] = {}
+        self._serve_seq = 0
+        self._listeners: List[Callable[[], None]] = []
         
         self._load_data()
+        self._load_queue()
     
     def _load_data(self) -> None:
         """Load history from disk"""
@@ -84,6 +133,197 @@ class QueueManager:
     
 
     
+    def _load_queue(self) -> None:
+        """Replay the queue journal, recovering items that were in flight"""
+        if not self.queue_file.exists():
+            return
+        try:
+            with open(self.queue_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        self._apply_journal_entry(json.loads(line))
+                    except Exception:
+                        continue  # Torn write from a crash; skip the record
+        except Exception:
+            self.queue = {}
+        
+        # Anything that was in flight when the app stopped goes back to pending;
+        # yt-dlp finds the transferred files and only redoes the post-processing
+        for item in self.queue.values():
+            if item.status in (DownloadStatus.DOWNLOADING, DownloadStatus.PROCESSING):
+                item.status = DownloadStatus.PENDING
+                item.started_at = None
+        self._compact_queue()
+    
+    def _apply_journal_entry(self, entry: Dict[str, Any]) -> None:
+        op = entry.get('op')
+        if op == 'add':
+            item = DownloadItem.from_dict(entry['item'])
+            self.queue[item.id] = item
+        elif op == 'update':
+            item = self.queue.get(entry['id'])
+            if item is not None:
+                updated = DownloadItem.from_dict({**item.to_dict(), **entry['fields']})
+                self.queue[item.id] = updated
+        elif op == 'done':
+            self.queue.pop(entry['id'], None)
+    
+    def _append_journal(self, entries: List[Dict[str, Any]]) -> None:
+        """Append state transitions to the queue journal and flush them to disk"""
+        try:
+            with open(self.queue_file, 'a', encoding='utf-8') as f:
+                for entry in entries:
+                    f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._journal_lines += len(entries)
+        except Exception:
+            pass  # Silently fail if we can't save
+        
+        # Rewrite the journal once finished items dominate it
+        if self._journal_lines > max(200, 4 * len(self.queue)):
+            self._compact_queue()
+    
+    def _compact_queue(self) -> None:
+        """Rewrite the journal as one 'add' record per live item"""
+        tmp_file = self.queue_file.with_suffix('.jsonl.tmp')
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                for item in self.queue.values():
+                    f.write(json.dumps({'op': 'add', 'item': item.to_dict()}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.queue_file)
+            self._journal_lines = len(self.queue)
+        except Exception:
+            pass
+        # Forget the turns of groups that have nothing queued any more
+        live = {fair_share_key(item) for item in self.queue.values()}
+        self._served = {key: seq for key, seq in self._served.items() if key in live}
+    
+    def _update_entry(self, item: DownloadItem, *names: str) -> Dict[str, Any]:
+        data = item.to_dict()
+        return {'op': 'update', 'id': item.id, 'fields': {name: data.get(name) for name in names}}
+    
+    def add_queue_listener(self, callback: Callable[[], None]) -> None:
+        """Register a callback invoked whenever new work is queued"""
+        self._listeners.append(callback)
+    
+    def _notify_listeners(self) -> None:
+        for callback in list(self._listeners):
+            callback()
+    
+    def enqueue(self, item: DownloadItem) -> bool:
+        """Add a pending item to the durable work queue; False if its video is already queued"""
+        return not self.enqueue_many([item])
+    
+    def enqueue_many(self, items: List[DownloadItem]) -> List[DownloadItem]:
+        """Add several pending items with a single journal write.
+
+        Items whose video is already queued or running, or appears earlier in
+        ``items``, are not added: two jobs for one video would write the same
+        ``.part`` file. Returns those duplicates.
+        """
+        live = self.queued_keys()
+        entries = []
+        duplicates = []
+        for item in items:
+            keys = video_keys(item)
+            if any(key in live for key in keys):
+                duplicates.append(item)
+                continue
+            live.update(keys)
+            item.status = DownloadStatus.PENDING
+            self.queue[item.id] = item
+            entries.append({'op': 'add', 'item': item.to_dict()})
+        if entries:
+            self._append_journal(entries)
+            self._notify_listeners()
+        return duplicates
+    
+    def queued_keys(self) -> Set[str]:
+        """The video_keys of every item waiting or running in the work queue"""
+        # list() copies in one step, so threads that only check for duplicates can call this too
+        return {key for item in list(self.queue.values()) for key in video_keys(item)}
+    
+    def mark_started(self, item: DownloadItem) -> None:
+        """Record that a queued item is now downloading"""
+        item.status = DownloadStatus.DOWNLOADING
+        item.started_at = datetime.now()
+        self._serve_seq += 1
+        self._served[fair_share_key(item)] = self._serve_seq
+        self._append_journal([self._update_entry(item, 'status', 'started_at')])
+    
+    def requeue(self, item: DownloadItem, retry_at: Optional[float] = None) -> None:
+        """Put a failed item back in the queue, optionally not to start before ``retry_at``"""
+        item.status = DownloadStatus.PENDING
+        item.started_at = None
+        item.retry_at = retry_at
+        self.queue[item.id] = item
+        self._append_journal([self._update_entry(item, 'status', 'started_at', 'attempts', 'retry_at', 'error_message')])
+    
+    def update_queue_item(self, item: DownloadItem, *names: str) -> None:
+        """Journal changes to the given fields of a queued item"""
+        if item.id in self.queue:
+            self._append_journal([self._update_entry(item, *names)])
+    
+    def mark_finished(self, item: DownloadItem) -> None:
+        """Remove a completed, failed or cancelled item from the work queue"""
+        if item.completed_at is None:
+            item.completed_at = datetime.now()
+        if self.queue.pop(item.id, None) is not None:
+            self._append_journal([{'op': 'done', 'id': item.id, 'status': item.status.value}])
+        if item.status == DownloadStatus.COMPLETED:
+            self.archive.add(item.archive_key or archive_key_for_url(item.url), item.url, item.title)
+    
+    def is_archived(self, item: DownloadItem) -> bool:
+        """Check whether the video of ``item`` was already downloaded"""
+        return (item.archive_key or archive_key_for_url(item.url)) in self.archive
+    
+    def get_queue(self) -> List[DownloadItem]:
+        """Get all queued items (pending and in progress)"""
+        return list(self.queue.values())
+    
+    def get_pending(self) -> List[DownloadItem]:
+        """Get queued items waiting for a download slot"""
+        return [item for item in self.queue.values() if item.status == DownloadStatus.PENDING]
+    
+    def pending_in_start_order(self, min_priority: Optional[int] = None) -> Iterator[DownloadItem]:
+        """Yield pending items in the order they should start.
+
+        Higher priorities go first. Within a priority, fair-share groups
+        (playlists, channels) take turns, the one that started an item least
+        recently going next, so a single URL does not wait behind a whole
+        channel; items of one group keep their submission order.
+        """
+        groups: Dict[Tuple[int, str], List[DownloadItem]] = {}
+        for item in self.queue.values():
+            if item.status != DownloadStatus.PENDING:
+                continue
+            if min_priority is not None and item.priority < min_priority:
+                continue
+            groups.setdefault((item.priority, fair_share_key(item)), []).append(item)
+        # sorted() is stable, so groups that tie keep the order of their first item
+        for key in sorted(groups, key=lambda k: (-k[0], self._served.get(k[1], 0))):
+            yield from groups[key]
+
+    def next_pending(
+        self, accept: Optional[Callable[[DownloadItem], bool]] = None, min_priority: Optional[int] = None
+    ) -> Optional[DownloadItem]:
+        """Get the next item that should be started, optionally skipping items ``accept`` rejects"""
+        for item in self.pending_in_start_order(min_priority):
+            if accept is None or accept(item):
+                return item
+        return None
+
+    def set_priority(self, item: DownloadItem, priority: int) -> None:
+        """Change the priority of a queued item"""
+        item.priority = priority
+        self.update_queue_item(item, 'priority')
+    
     def _save_history(self) -> None:
         """Save history to disk"""
         try:
@@ -119,8 +359,8 @@ class QueueManager:
         """Get failed downloads from history"""
         return [item for item in self.history if item.status == DownloadStatus.FAILED]
     
-    def retry_failed_download(self, item: DownloadItem) -> DownloadItem:
-        """Create a new history item from a failed download"""
+    def retry_failed_download(self, item: DownloadItem) -> Optional[DownloadItem]:
+        """Queue a new pending download from a failed one; None if its video is already queued"""
         new_item = DownloadItem(
             url=item.url,
             title=item.title,
@@ -131,8 +371,9 @@ class QueueManager:
             output_path=item.output_path,
             options=item.options,
             status=DownloadStatus.PENDING,
-            added_at=datetime.now()
+            added_at=datetime.now(),
+            archive_key=item.archive_key,
+            priority=item.priority,
         )
-        self.add_to_history(new_item)
-        return new_item
+        return new_item if self.enqueue(new_item) else None
 
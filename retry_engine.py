@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import random
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, Optional
+
+from fragment_tuner import host_for_url
+
+
+# Failure classes
+RATE_LIMITED = "rate_limited"
+FORBIDDEN = "forbidden"
+NETWORK = "network"
+EXTRACTOR = "extractor"
+FFMPEG = "ffmpeg"
+UNKNOWN = "unknown"
+
+ERROR_LABELS = {
+    RATE_LIMITED: "Rate limited (HTTP 429)",
+    FORBIDDEN: "Access denied (HTTP 403)",
+    NETWORK: "Network error",
+    EXTRACTOR: "Extractor error",
+    FFMPEG: "FFmpeg error",
+    UNKNOWN: "Download error",
+}
+
+# Checked in order; the first matching class wins
+_PATTERNS = [
+    (RATE_LIMITED, re.compile(r"\b429\b|too many requests|rate.?limit", re.IGNORECASE)),
+    (FORBIDDEN, re.compile(r"\b403\b|forbidden", re.IGNORECASE)),
+    # Any other client error (404, 410, ...) is permanent
+    (EXTRACTOR, re.compile(r"http error 4\d\d", re.IGNORECASE)),
+    (FFMPEG, re.compile(r"ffmpeg|ffprobe|postprocessing|conversion failed|merg(e|ing) .*formats", re.IGNORECASE)),
+    (
+        NETWORK,
+        re.compile(
+            r"timed? ?out|connection (reset|refused|aborted)|remote end closed|incompleteread|"
+            r"name resolution|getaddrinfo|network is unreachable|urlopen error|"
+            r"http error 5\d\d|\b50[0234]\b|errno (104|110|111|113)|got server http error|"
+            r"unable to download (webpage|video data)",
+            re.IGNORECASE,
+        ),
+    ),
+    (
+        EXTRACTOR,
+        re.compile(
+            r"unsupported url|video unavailable|private video|sign in|members.only|not available|"
+            r"has been removed|copyright|unable to extract|requested format is not available|^error: \[",
+            re.IGNORECASE,
+        ),
+    ),
+]
+
+
+def classify_error(message: Optional[str]) -> str:
+    """Map a yt-dlp error message to one of the failure classes"""
+    for kind, pattern in _PATTERNS:
+        if message and pattern.search(message):
+            return kind
+    return UNKNOWN
+
+
+@dataclass
+class RetryPolicy:
+    """How often and how patiently one failure class is retried"""
+
+    max_attempts: int
+    base_delay: float  # seconds before the first retry
+    max_delay: float
+
+
+# Extractor, ffmpeg and unknown failures are permanent: a retry fails the same way
+DEFAULT_POLICIES: Dict[str, RetryPolicy] = {
+    RATE_LIMITED: RetryPolicy(max_attempts=5, base_delay=30.0, max_delay=900.0),
+    # Usually an expired media URL; a fresh extraction on retry fixes it
+    FORBIDDEN: RetryPolicy(max_attempts=2, base_delay=5.0, max_delay=60.0),
+    NETWORK: RetryPolicy(max_attempts=4, base_delay=5.0, max_delay=300.0),
+}
+
+
+class RetryEngine:
+    """Decides whether and when a failed download is retried.
+
+    Delays grow exponentially per attempt with jitter, so items that failed
+    together do not retry together. Per host, a rate-limit response pauses
+    every retry for that host, and at most ``host_budget`` retries are spent
+    within ``host_window`` seconds so a broken site cannot keep the queue busy.
+    """
+
+    def __init__(
+        self,
+        policies: Optional[Dict[str, RetryPolicy]] = None,
+        host_budget: int = 20,
+        host_window: float = 600.0,
+        clock: Callable[[], float] = time.time,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        self.policies = dict(DEFAULT_POLICIES if policies is None else policies)
+        self.host_budget = host_budget
+        self.host_window = host_window
+        self._clock = clock
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self._host_retries: Dict[str, Deque[float]] = {}
+        self._host_paused_until: Dict[str, float] = {}
+
+    def backoff(self, policy: RetryPolicy, attempt: int) -> float:
+        """Delay before retry number ``attempt`` (1-based): half fixed, half random"""
+        ceiling = min(policy.max_delay, policy.base_delay * (2 ** max(0, attempt - 1)))
+        return ceiling / 2 + self._rng.uniform(0, ceiling / 2)
+
+    def plan(self, url: str, error: Optional[str], attempts: int) -> Optional[float]:
+        """Seconds to wait before the next attempt, or None to give up.
+
+        ``attempts`` is the number of retries already made for the item.
+        """
+        kind = classify_error(error)
+        policy = self.policies.get(kind)
+        if policy is None or attempts >= policy.max_attempts:
+            return None
+
+        host = host_for_url(url)
+        now = self._clock()
+        with self._lock:
+            recent = self._host_retries.setdefault(host, deque())
+            while recent and recent[0] <= now - self.host_window:
+                recent.popleft()
+            if len(recent) >= self.host_budget:
+                return None
+            recent.append(now)
+
+            delay = self.backoff(policy, attempts + 1)
+            if kind == RATE_LIMITED:
+                self._host_paused_until[host] = max(self._host_paused_until.get(host, 0.0), now + delay)
+            # Never retry into a pause another item's 429 started
+            delay = max(delay, self._host_paused_until.get(host, 0.0) - now)
+        return delay
+
+    def paused_until(self, url: str) -> float:
+        """Time before which no download for this host should start, 0 if none"""
+        with self._lock:
+            return self._host_paused_until.get(host_for_url(url), 0.0)
@@ -0,0 +1,301 @@
+"""Multi-connection downloads of progressive (single-file) formats.
+
+``concurrent_fragment_downloads`` only helps formats that are already split
+into fragments (DASH/HLS). A progressive format is one file that yt-dlp
+fetches over a single HTTP connection, so a CDN that throttles per connection
+caps the whole download. SegmentedHttpFD splits such a file into byte ranges,
+fetches them over several connections and writes each range in place into
+the ``.part`` file. A small journal next to it records how far every range
+got on disk, so an interrupted download continues where it stopped.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from yt_dlp.downloader import get_suitable_downloader
+from yt_dlp.downloader.http import HttpFD
+from yt_dlp.networking import Request
+from yt_dlp.networking.exceptions import HTTPError, TransportError
+from yt_dlp.utils.networking import HTTPHeaderDict
+
+
+# Files smaller than this per connection are not worth the extra requests
+MIN_SEGMENT_SIZE = 4 * 1024 * 1024
+BLOCK_SIZE = 64 * 1024
+# Journal written next to the .part file; lists [start, end, done] per range
+SEGMENTS_SUFFIX = ".segments"
+JOURNAL_INTERVAL = 1.0
+# How often each connection syncs its writes to disk, so the journal can record them
+SYNC_INTERVAL = 1.0
+
+
+def read_journal(tmpfilename: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(tmpfilename + SEGMENTS_SUFFIX, "r", encoding="utf-8") as f:
+            journal = json.load(f)
+        if isinstance(journal.get("total"), int) and isinstance(journal.get("segments"), list):
+            return journal
+    except Exception:
+        pass
+    return None
+
+
+def journal_bytes(tmpfilename: str) -> Optional[int]:
+    """Bytes a segmented download has really written into ``tmpfilename``, or None without a journal"""
+    journal = read_journal(tmpfilename)
+    if journal is None:
+        return None
+    return sum(int(done) for _start, _end, done in journal["segments"])
+
+
+def plan_segments(total: int, connections: int) -> List[List[int]]:
+    """Split ``total`` bytes into at most ``connections`` [start, end, done] ranges"""
+    count = max(1, min(connections, total // MIN_SEGMENT_SIZE))
+    size = -(-total // count)
+    return [[start, min(start + size, total) - 1, 0] for start in range(0, total, size)]
+
+
+class _SegmentState:
+    """Shared bookkeeping of one segmented download"""
+
+    def __init__(self, total: int, segments: List[List[int]]) -> None:
+        self.total = total
+        self.segments = segments
+        self.lock = threading.Lock()
+        self.stop = threading.Event()
+        self.error: Optional[BaseException] = None
+        self.resumed = self.downloaded  # from an earlier attempt, not counted in the speed
+        # Range start -> bytes of the range known to be on disk; only these go into the journal
+        self.synced = {start: done for start, _end, done in segments}
+
+    @property
+    def downloaded(self) -> int:
+        return sum(done for _start, _end, done in self.segments)
+
+    def fail(self, error: BaseException) -> None:
+        with self.lock:
+            if self.error is None:
+                self.error = error
+        self.stop.set()
+
+
+class SegmentedHttpFD(HttpFD):
+    """HttpFD that fetches large files over several range requests at once.
+
+    Falls back to the single-connection HttpFD when the server does not
+    support ranges, the size is unknown or too small, or options that only
+    HttpFD implements (rate limit, chunked requests) are set.
+    """
+
+    FD_NAME = "segmented"
+
+    def __init__(self, ydl, params, connections: int) -> None:
+        super().__init__(ydl, params)
+        self.connections = connections
+
+    def real_download(self, filename, info_dict):
+        if (
+            self.params.get("ratelimit") or self.params.get("http_chunk_size") or self.params.get("test")
+            or info_dict.get("request_data") or self._get_impersonate_target(info_dict) is not None
+        ):
+            return super().real_download(filename, info_dict)
+
+        url = info_dict["url"]
+        headers = HTTPHeaderDict({"Accept-Encoding": "identity"}, info_dict.get("http_headers"))
+        if "Range" in headers:
+            return super().real_download(filename, info_dict)
+        tmpfilename = self.temp_name(filename)
+
+        resume = self.params.get("continuedl", True) and os.path.isfile(tmpfilename)
+        journal = read_journal(tmpfilename) if resume else None
+        if journal is not None:
+            total, segments = journal["total"], [list(map(int, s)) for s in journal["segments"]]
+        elif resume:
+            # Left by a single-connection attempt, which resumes it from its length
+            return super().real_download(filename, info_dict)
+        else:
+            total = self._probe_size(url, headers)
+            if not total or total < 2 * MIN_SEGMENT_SIZE:
+                return super().real_download(filename, info_dict)
+            segments = plan_segments(total, self.connections)
+            if len(segments) < 2:
+                return super().real_download(filename, info_dict)
+            # A sparse file of the final size; every range writes at its own offset
+            with open(tmpfilename, "wb") as f:
+                f.truncate(total)
+
+        state = _SegmentState(total, segments)
+        started = time.time()
+        workers = [
+            threading.Thread(
+                target=self._fetch_segment,
+                args=(state, segment, url, headers, tmpfilename, filename, info_dict, started),
+                name=f"segment-{index}",
+                daemon=True,
+            )
+            for index, segment in enumerate(segments)
+            if segment[2] < segment[1] - segment[0] + 1
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            while any(worker.is_alive() for worker in workers):
+                for worker in workers:
+                    worker.join(JOURNAL_INTERVAL / len(workers))
+                self._write_journal(tmpfilename, state)
+        except BaseException as err:
+            state.fail(err)
+            raise
+        finally:
+            state.stop.set()
+            for worker in workers:
+                worker.join()
+            self._write_journal(tmpfilename, state)
+
+        if state.error is not None:
+            raise state.error
+        if state.downloaded != total:
+            self.report_error(f"segmented download incomplete: {state.downloaded} of {total} bytes")
+            return False
+
+        try:
+            os.remove(tmpfilename + SEGMENTS_SUFFIX)
+        except OSError:
+            pass
+        self.try_rename(tmpfilename, filename)
+        self._hook_progress({
+            "downloaded_bytes": total,
+            "total_bytes": total,
+            "filename": filename,
+            "status": "finished",
+            "elapsed": time.time() - started,
+        }, info_dict)
+        return True
+
+    def _probe_size(self, url: str, headers: HTTPHeaderDict) -> Optional[int]:
+        """Total size from a one-byte range request, or None when the server ignores ranges"""
+        try:
+            response = self.ydl.urlopen(Request(url, None, HTTPHeaderDict(headers, {"Range": "bytes=0-0"})))
+        except (HTTPError, TransportError):
+            return None
+        try:
+            if response.status != 206:
+                return None
+            content_range = response.headers.get("Content-Range") or ""
+            _, _, total = content_range.rpartition("/")
+            return int(total) if total.isdigit() else None
+        finally:
+            response.close()
+
+    def _fetch_segment(self, state: _SegmentState, segment: List[int], url: str, headers: HTTPHeaderDict,
+                       tmpfilename: str, filename: str, info_dict: Dict[str, Any], started: float) -> None:
+        start, end, _ = segment
+        retries = self.params.get("retries", 10)
+        attempt = 0
+        try:
+            with open(tmpfilename, "r+b") as stream:
+                try:
+                    while segment[2] < end - start + 1 and not state.stop.is_set():
+                        position = start + segment[2]
+                        try:
+                            self._copy_range(state, segment, stream, url, headers, position, tmpfilename, filename,
+                                             info_dict, started)
+                            attempt = 0
+                        except (HTTPError, TransportError, OSError) as err:
+                            attempt += 1
+                            if attempt > retries:
+                                raise
+                            self.report_retry(err, attempt, retries)
+                            state.stop.wait(min(attempt, 5))
+                finally:
+                    try:
+                        self._sync(state, segment, stream)
+                    except OSError:
+                        pass  # The journal keeps the last synced offset
+        except BaseException as err:
+            state.fail(err)
+
+    @staticmethod
+    def _sync(state: _SegmentState, segment: List[int], stream) -> None:
+        """Flush and fsync what this range wrote, then let the journal record it"""
+        done = segment[2]  # Only this range's own thread advances it
+        stream.flush()
+        os.fsync(stream.fileno())
+        with state.lock:
+            state.synced[segment[0]] = done
+
+    def _copy_range(self, state: _SegmentState, segment: List[int], stream, url: str, headers: HTTPHeaderDict,
+                    position: int, tmpfilename: str, filename: str, info_dict: Dict[str, Any],
+                    started: float) -> None:
+        start, end, _ = segment
+        request = Request(url, None, HTTPHeaderDict(headers, {"Range": f"bytes={position}-{end}"}))
+        response = self.ydl.urlopen(request)
+        try:
+            if response.status != 206 or not (response.headers.get("Content-Range") or "").startswith(
+                f"bytes {position}-"
+            ):
+                raise TransportError(f"server did not return the requested range {position}-{end}")
+            stream.seek(position)
+            synced_at = time.monotonic()
+            while not state.stop.is_set():
+                block = response.read(min(BLOCK_SIZE, end + 1 - position))
+                if not block:
+                    break
+                stream.write(block)
+                position += len(block)
+                # Progress hooks run one at a time; a hook that sleeps (shared speed
+                # limit) holds back every connection, one that raises (cancel) stops them
+                with state.lock:
+                    segment[2] = position - start
+                    self._report(state, tmpfilename, filename, info_dict, started)
+                if position > end:
+                    break
+                if time.monotonic() - synced_at >= SYNC_INTERVAL:
+                    self._sync(state, segment, stream)
+                    synced_at = time.monotonic()
+        finally:
+            response.close()
+
+    def _report(self, state: _SegmentState, tmpfilename: str, filename: str, info_dict: Dict[str, Any],
+                started: float) -> None:
+        downloaded = state.downloaded
+        now = time.time()
+        speed = self.calc_speed(started, now, downloaded - state.resumed)
+        self._hook_progress({
+            "status": "downloading",
+            "downloaded_bytes": downloaded,
+            "total_bytes": state.total,
+            "tmpfilename": tmpfilename,
+            "filename": filename,
+            "eta": self.calc_eta(speed, state.total - downloaded),
+            "speed": speed,
+            "elapsed": now - started,
+            "segmented": True,  # written out of order, so not a growing prefix of the file
+        }, info_dict)
+
+    def _write_journal(self, tmpfilename: str, state: _SegmentState) -> None:
+        """Record the synced offsets; claiming unsynced bytes could leave holes after a crash"""
+        with state.lock:
+            segments = [[start, end, state.synced[start]] for start, end, _done in state.segments]
+        journal_file = tmpfilename + SEGMENTS_SUFFIX
+        # Replaced whole: a torn journal would make the sparse .part look like a single-connection partial
+        try:
+            with open(journal_file + ".tmp", "w", encoding="utf-8") as f:
+                json.dump({"total": state.total, "segments": segments}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(journal_file + ".tmp", journal_file)
+        except OSError:
+            pass
+
+
+def segment_connections(info: Dict[str, Any], params: Dict[str, Any]) -> int:
+    """Connections per file for ``info``, or 0 when it does not go through the plain HttpFD"""
+    connections = int(params.get("connections_per_file") or 1)
+    if connections < 2 or get_suitable_downloader(info, params) is not HttpFD:
+        return 0
+    return connections
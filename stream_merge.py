@@ -0,0 +1,143 @@
+"""Streaming merge: download the video and audio of a "video+audio" format with one ffmpeg.
+
+yt-dlp normally downloads both formats to separate files and has ffmpeg
+re-read them to mux the result. When every requested format is plain HTTP,
+yt-dlp can instead hand all URLs to a single ffmpeg process (its "direct
+merge" path) that muxes the streams as they arrive and writes only the final
+container. This module switches that path on per download and fills in what
+FFmpegFD lacks for our job engine: progress hooks while ffmpeg runs, which
+also lets a cancel from a progress hook stop ffmpeg.
+"""
+from __future__ import annotations
+
+import os
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from yt_dlp.downloader import external as _external
+
+
+# external_downloader mapping that routes HTTP(S) formats to ffmpeg
+STREAM_MERGE_DOWNLOADERS = {"http": "ffmpeg"}
+# How often progress is reported while ffmpeg runs
+PROGRESS_INTERVAL = 0.5
+
+# yt-dlp's FFmpegFD starts ffmpeg through this module global; without it, streamed merges are off
+_YtdlpPopen = getattr(_external, "Popen", None)
+STREAM_MERGE_AVAILABLE = isinstance(_YtdlpPopen, type) and issubclass(_YtdlpPopen, subprocess.Popen)
+
+_tickers: Dict[int, Callable[[subprocess.Popen], None]] = {}
+_watch_lock = threading.Lock()
+_watchers = 0
+
+
+class _WatchedPopen(_YtdlpPopen if STREAM_MERGE_AVAILABLE else subprocess.Popen):
+    """yt-dlp's Popen with a wait() that calls the ticker registered for the waiting thread.
+
+    FFmpegFD blocks in ``proc.wait()`` for the whole download. Waiting in
+    short slices lets the ticker report progress; an exception it raises (a
+    cancelled download) leaves wait(), and FFmpegFD then kills ffmpeg itself.
+    Threads without a ticker wait exactly as before.
+    """
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        ident = threading.get_ident()
+        tick = _tickers.get(ident)
+        if tick is None or timeout is not None:
+            return super().wait(timeout)
+        while True:
+            try:
+                return super().wait(PROGRESS_INTERVAL)
+            except subprocess.TimeoutExpired:
+                pass
+            try:
+                tick(self)
+            except BaseException:
+                # FFmpegFD's cleanup waits for the killed process again
+                _tickers.pop(ident, None)
+                raise
+
+
+@contextmanager
+def watch_processes(tick: Callable[[subprocess.Popen], None]) -> Iterator[None]:
+    """Call ``tick(proc)`` about every PROGRESS_INTERVAL while this thread waits for a yt-dlp subprocess.
+
+    yt-dlp's Popen is replaced only while at least one thread is inside this
+    context, and restored when the last one leaves.
+    """
+    global _watchers
+    ident = threading.get_ident()
+    with _watch_lock:
+        _tickers[ident] = tick
+        _watchers += 1
+        if _watchers == 1:
+            _external.Popen = _WatchedPopen
+    try:
+        yield
+    finally:
+        with _watch_lock:
+            _tickers.pop(ident, None)
+            _watchers -= 1
+            if _watchers == 0:
+                _external.Popen = _YtdlpPopen
+
+
+def can_stream_merge(info: Dict[str, Any], params: Dict[str, Any]) -> bool:
+    """Whether the selected formats of ``info`` can be muxed by one ffmpeg while downloading"""
+    formats = info.get("requested_formats")
+    if not STREAM_MERGE_AVAILABLE or not params.get("stream_merge") or not formats or len(formats) < 2:
+        return False
+    # ffmpeg cannot honour a per-download speed limit
+    if params.get("ratelimit"):
+        return False
+    # Without ffmpeg on PATH, yt-dlp falls back to separate downloads and a merge by itself
+    return all(f.get("protocol") in ("http", "https") for f in formats)
+
+
+def output_path(proc: subprocess.Popen) -> Optional[str]:
+    """The file an ffmpeg command line writes to (its last argument)"""
+    args = proc.args if isinstance(proc.args, (list, tuple)) else None
+    if not args:
+        return None
+    target = str(args[-1])
+    return target[len("file:"):] if target.startswith("file:") else target
+
+
+class StreamProgress:
+    """Turns the growing output file of a streaming merge into progress hook updates"""
+
+    def __init__(self, info: Dict[str, Any], hooks) -> None:
+        self.info = info
+        self.hooks = hooks
+        self.total = sum(f.get("filesize") or f.get("filesize_approx") or 0 for f in info.get("requested_formats") or [])
+        self.started = time.monotonic()
+        self._last = (self.started, 0)
+
+    def __call__(self, proc: subprocess.Popen) -> None:
+        path = output_path(proc)
+        if not path or not path.endswith(".part"):
+            return  # Some other subprocess, e.g. an ffmpeg version check
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+        now = time.monotonic()
+        last_time, last_size = self._last
+        speed = (size - last_size) / (now - last_time) if now > last_time and size >= last_size else None
+        self._last = (now, size)
+        status = {
+            "status": "downloading",
+            "downloaded_bytes": size,
+            "total_bytes_estimate": self.total or None,
+            "tmpfilename": path,
+            "filename": path[:-len(".part")],
+            "elapsed": now - self.started,
+            "speed": speed,
+            "eta": int((self.total - size) / speed) if speed and self.total > size else None,
+            "info_dict": self.info,
+        }
+        for hook in self.hooks:
+            hook(status)
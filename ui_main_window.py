@@ -1,9 +1,11 @@
 from typing import Optional, Dict, Any, List
 import os
 import shutil
+import threading
+import uuid
 from datetime import datetime
 
-from PySide6.QtCore import Qt, QSize, QThread
+from PySide6.QtCore import Qt, QSize
 from PySide6.QtGui import QAction, QPixmap, QIcon, QFont # <--- IMPORT ADDED HERE
 from PySide6.QtWidgets import (
     QMainWindow,
@@ -21,19 +23,38 @@ from PySide6.QtWidgets import (
     QMessageBox,
     QMenu,
     QSizePolicy,
+    QApplication,
 )
 
-from ytdl_worker import YtDlWorker, list_formats, InfoWorker, ThumbWorker
+from ytdl_worker import list_formats, list_playlist_entries, is_playlist_info, InfoWorker, ThumbWorker
 from style import dark_stylesheet
 from subtitle_dialog import SubtitleDialog
 from custom_command_dialog import CustomCommandDialog
 from download_settings_dialog import DownloadSettingsDialog
 from ytdl_worker import PipUpdateWorker
-from queue_manager import QueueManager, DownloadItem, DownloadStatus
+from queue_manager import PRIORITY_HIGH, QueueManager, DownloadItem, DownloadStatus
+from download_scheduler import DownloadScheduler
+from download_progress import DownloadProgress
+from bandwidth_governor import parse_rate
+from download_options import DEFAULT_AUDIO_FORMAT, DownloadOptions, build_ydl_opts, default_downloads_dir
+from download_archive import archive_key, archive_key_for_info, archive_key_for_url
 from history_dialog import HistoryDialog
+from bulk_analyze_dialog import BulkAnalyzeDialog
+from metadata_cache import MetadataCache
+from probe_service import default_probe_service
 from loading_widget import LoadingButton
 
 
+# Format choices offered for playlists, where per-video formats are not known up front
+PLAYLIST_FORMAT_PRESETS = [
+    ("  Best quality", "bestvideo*+bestaudio/best", "preset"),
+    ("  Up to 1080p", "bestvideo*[height<=1080]+bestaudio/best[height<=1080]", "preset"),
+    ("  Up to 720p", "bestvideo*[height<=720]+bestaudio/best[height<=720]", "preset"),
+    ("  Up to 480p", "bestvideo*[height<=480]+bestaudio/best[height<=480]", "preset"),
+    ("  Audio only", "bestaudio/best", "none"),
+]
+
+
 class MainWindow(QMainWindow):
     def __init__(self) -> None:
         super().__init__()
@@ -57,6 +78,7 @@ class MainWindow(QMainWindow):
         self.analyze_btn = LoadingButton("Search")
         self.analyze_btn.setFixedSize(100, 40)
         self.analyze_btn.setObjectName("AccentButton")
+        self.analyze_btn.setToolTip("Videos analyzed recently load from a local cache; Shift+click to fetch them again.")
         header.addWidget(self.url_edit)
         header.addWidget(self.analyze_btn)
         self._layout.addLayout(header)
@@ -114,16 +136,20 @@ class MainWindow(QMainWindow):
 
         self.settings_btn = QPushButton("Settings & Options")
         self.history_btn = QPushButton("View History")
+        self.cancel_btn = QPushButton("Cancel")
         self.download_btn = LoadingButton("Download")
         self.download_btn.setObjectName("AccentButton")
         self.download_btn.setFixedHeight(40)
         self.history_btn.setFixedHeight(40)
+        self.cancel_btn.setFixedHeight(40)
+        self.cancel_btn.setEnabled(False)
         self.settings_btn.setFixedHeight(40)
 
         footer.addWidget(self.output_label)
         footer.addStretch()
         footer.addWidget(self.settings_btn)
         footer.addWidget(self.history_btn)
+        footer.addWidget(self.cancel_btn)
         footer.addWidget(self.download_btn)
         self._layout.addLayout(footer)
 
@@ -141,30 +167,57 @@ class MainWindow(QMainWindow):
         self.analyze_btn.clicked.connect(self._analyze)
         self.download_btn.clicked.connect(self._start_download)
         self.history_btn.clicked.connect(self._open_history)
+        self.cancel_btn.clicked.connect(self._cancel_downloads)
         self.settings_btn.clicked.connect(self._open_settings_menu)
         self.format_combo.currentIndexChanged.connect(self._on_format_selected)
 
         # --- State ---
         self.output_dir: Optional[str] = None
         self.last_info: Optional[Dict[str, Any]] = None
-        self.worker_thread: Optional[QThread] = None
         self.selected_format: Optional[str] = None
         self.available_subtitles: List[str] = []
         self.selected_subtitles: List[str] = []
         self.ffmpeg_location: Optional[str] = self._detect_ffmpeg()
         self._ffmpeg_warned: bool = False
         self.custom_overrides: Dict[str, str] = {}
-        self.settings_overrides: Dict[str, str] = {"concurrent": "4"}
+        self.settings_overrides: Dict[str, str] = {
+            "concurrent": "4", "max_downloads": "3", "playlist_downloads": "0", "backend": "thread",
+        }
 
         # --- Options State ---
         self.option_embed_subs = False
         self.option_sponsorblock = False
         self.option_save_thumbnail = False
         self.option_save_description = False
+        self.option_playlist_mode = False
 
         # --- History management ---
         self.queue_manager = QueueManager()
         self.history_dialog: Optional[HistoryDialog] = None
+        self.bulk_dialog: Optional[BulkAnalyzeDialog] = None
+        self.metadata_cache = MetadataCache(self.queue_manager.data_dir / "metadata_cache.sqlite3")
+        # Pays the first probe's one-time setup now instead of during the first Search
+        threading.Thread(target=default_probe_service().warm_up, name="probe-warm-up", daemon=True).start()
+
+        # --- Download scheduling ---
+        self.scheduler = DownloadScheduler(
+            self.queue_manager,
+            int(self.settings_overrides["max_downloads"]),
+            self.settings_overrides["backend"],
+            self,
+        )
+        self.scheduler.item_started.connect(self._on_item_started)
+        self.scheduler.item_duplicate.connect(self._on_item_duplicate)
+        self.scheduler.item_progress.connect(self._on_progress)
+        self.scheduler.item_resumed.connect(self._on_item_resumed)
+        self.scheduler.item_retrying.connect(self._on_item_retrying)
+        self.scheduler.item_deferred.connect(self._on_item_deferred)
+        self.scheduler.item_finished.connect(self._on_item_finished)
+        self.scheduler.batch_progress.connect(self._on_batch_progress)
+        self.scheduler.set_batch_limit(int(self.settings_overrides["playlist_downloads"]))
+        self.scheduler.set_speed_limit(parse_rate(self.settings_overrides.get("speed_limit")))
+        self._item_progress: Dict[str, int] = {}
+        self._session_results: Dict[str, int] = {"ok": 0, "failed": 0, "cancelled": 0}
 
         # --- Setup ---
         self._setup_settings_menu()
@@ -172,6 +225,17 @@ class MainWindow(QMainWindow):
         self.output_label.setText(f"Output: {self.output_dir}")
         self._update_ui_state(is_idle=True)
 
+        # Pick up downloads left unfinished by a previous session
+        resumed = self.scheduler.resume()
+        if resumed:
+            self.statusBar().showMessage(f"Resuming {resumed} queued downloads", 5000)
+            self._refresh_download_state()
+
+    def closeEvent(self, event) -> None:
+        # Unfinished downloads stay queued and resume from their partial files next start
+        self.scheduler.shutdown()
+        super().closeEvent(event)
+
     def _create_icon(self) -> QIcon:
         # Try to load the logo from the svgs folder
         # Try ICO first (better Windows compatibility), then PNG as fallback
@@ -203,14 +267,19 @@ class MainWindow(QMainWindow):
         self.action_save_thumb.toggled.connect(lambda checked: setattr(self, 'option_save_thumbnail', checked))
         self.action_save_desc = QAction("Save Description", self, checkable=True)
         self.action_save_desc.toggled.connect(lambda checked: setattr(self, 'option_save_description', checked))
+        self.action_playlist_mode = QAction("Playlist / Channel Mode", self, checkable=True)
+        self.action_playlist_mode.setToolTip("Download every video of a playlist or channel URL in parallel.")
+        self.action_playlist_mode.toggled.connect(lambda checked: setattr(self, 'option_playlist_mode', checked))
 
         self.settings_menu.addAction(self.action_embed_subs)
         self.settings_menu.addAction(self.action_sponsorblock)
         self.settings_menu.addAction(self.action_save_thumb)
         self.settings_menu.addAction(self.action_save_desc)
+        self.settings_menu.addAction(self.action_playlist_mode)
         self.settings_menu.addAction("Select Subtitles...", self._pick_subtitles)
         self.settings_menu.addSeparator()
 
+        self.settings_menu.addAction("Bulk Analyze...", self._open_bulk_analyze)
         self.settings_menu.addAction("Download Settings...", self._open_download_settings)
         self.settings_menu.addAction("Custom Command...", self._open_custom_cmd)
         self.settings_menu.addAction("Update yt-dlp...", self._update_ytdlp)
@@ -259,14 +328,37 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Invalid URL", "Please paste a valid video URL.")
             return
 
+        if not self.option_playlist_mode and not self._confirm_archived(url):
+            return
+
         self._update_ui_state(is_analyzing=True)
-        self._info_worker = InfoWorker(url)
+        # Shift bypasses the metadata cache, e.g. for a video whose formats changed
+        refresh = bool(QApplication.keyboardModifiers() & Qt.ShiftModifier)
+        self._info_worker = InfoWorker(
+            url, playlist=self.option_playlist_mode, cache=self.metadata_cache, refresh=refresh
+        )
         self._info_worker.info.connect(self._on_info_ready)
         self._info_worker.error.connect(self._on_info_error)
         self._info_worker.start()
 
+    def _confirm_archived(self, url: str) -> bool:
+        """Ask before re-analyzing a video that is already in the download archive"""
+        entry = self.queue_manager.archive.get(archive_key_for_url(url))
+        if entry is None:
+            return True
+        when = entry["added_at"][:10] if entry.get("added_at") else "earlier"
+        reply = QMessageBox.question(
+            self, "Already Downloaded",
+            f"'{entry.get('title') or url}' was already downloaded ({when}).\n\nAnalyze it again?",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        return reply == QMessageBox.Yes
+
     def _on_info_ready(self, info: Dict[str, Any]) -> None:
         self.last_info = info
+        if is_playlist_info(info):
+            self._on_playlist_ready(info)
+            return
         self._populate_metadata(info)
         self._populate_formats(list_formats(info))
         subs = sorted(list((info.get("subtitles") or {}).keys()))
@@ -279,6 +371,28 @@ class MainWindow(QMainWindow):
             self._apply_history_settings(self._pending_history_item)
             delattr(self, '_pending_history_item')
 
+    def _on_playlist_ready(self, info: Dict[str, Any]) -> None:
+        entries = list_playlist_entries(info)
+        self.available_subtitles = []
+        self.meta_title.setText(info.get("title") or "Untitled playlist")
+        self.meta_uploader.setText(info.get("uploader") or info.get("channel") or "Unknown Channel")
+        self.meta_duration.setText("Playlist")
+        self.meta_views.setText(f"{len(entries)} videos")
+        thumb_url = self._get_thumbnail_url() or next((e["thumbnail"] for e in entries if e.get("thumbnail")), None)
+        if thumb_url:
+            self._thumb_worker = ThumbWorker(thumb_url)
+            self._thumb_worker.ready.connect(self._on_thumb_ready)
+            self._thumb_worker.start()
+
+        self.format_combo.clear()
+        for label, format_sel, vcodec in PLAYLIST_FORMAT_PRESETS:
+            self.format_combo.addItem(label, userData={"format_id": format_sel, "vcodec": vcodec, "acodec": "preset"})
+        self.format_combo.setCurrentIndex(0)
+        self._update_ui_state(has_info=bool(entries))
+        self._update_option_states()
+        if not entries:
+            QMessageBox.warning(self, "Empty Playlist", "No downloadable videos were found at this URL.")
+
     def _on_info_error(self, message: str) -> None:
         self._update_ui_state(is_idle=True)
         QMessageBox.critical(self, "Error", message)
@@ -420,121 +534,230 @@ class MainWindow(QMainWindow):
         else:
             self.selected_format = format_id
 
-    def _build_ydl_opts(self) -> Dict[str, Any]:
-        if not self.selected_format:
-            format_sel = "bestvideo+bestaudio/best"
-        else:
-            format_sel = self.selected_format
-
-        base_dir = self.output_dir or self._downloads_dir()
-        outtmpl_path = os.path.join(base_dir, "%(title)s", "%(title)s.%(ext)s")
-
-        ydl_opts: Dict[str, Any] = {
-            "format": format_sel,
-            "outtmpl": {"default": outtmpl_path},
-            "noplaylist": True,
-            "concurrent_fragment_downloads": int(self.settings_overrides.get("concurrent", "4")),
-            "postprocessors": [],
-            "writethumbnail": self.option_save_thumbnail,
-            "writesubtitles": bool(self.selected_subtitles),
-            "subtitleslangs": self.selected_subtitles or ["en"],
-            "embedsubtitles": self.option_embed_subs,
-            "writedescription": self.option_save_description,
-        }
-        
-        selected_data = self.format_combo.currentData()
-        if selected_data and selected_data.get("vcodec") == "none":
-             ydl_opts["postprocessors"].append({
-                "key": "FFmpegExtractAudio",
-                "preferredcodec": "mp3",
-                "preferredquality": "0",
-            })
-
-        if self.option_sponsorblock:
-            sponsor_categories = ["sponsor", "selfpromo", "interaction", "intro", "outro", "preview", "music_offtopic"]
-            ydl_opts["sponsorblock_mark"] = sponsor_categories
-            ydl_opts["sponsorblock_remove"] = sponsor_categories
-
-        if self.ffmpeg_location:
-            ydl_opts["ffmpeg_location"] = self.ffmpeg_location
-        
-        return ydl_opts
+    def _build_ydl_opts(self, playlist_title: Optional[str] = None, use_selected_format: bool = True) -> Dict[str, Any]:
+        # The format list belongs to the analyzed video; other downloads take the best quality
+        selected_data = self.format_combo.currentData() if use_selected_format else None
+        options = DownloadOptions(
+            output_dir=self.output_dir or self._downloads_dir(),
+            format=self.selected_format if use_selected_format else None,
+            audio_only=bool(selected_data and selected_data.get("vcodec") == "none"),
+            audio_format=self.settings_overrides.get("audio_format", DEFAULT_AUDIO_FORMAT),
+            subtitles=list(self.selected_subtitles or []),
+            embed_subtitles=self.option_embed_subs,
+            save_thumbnail=self.option_save_thumbnail,
+            save_description=self.option_save_description,
+            sponsorblock=self.option_sponsorblock,
+            sponsorblock_categories=self.settings_overrides.get("sb_categories") or None,
+            concurrent_fragments=int(self.settings_overrides.get("concurrent", "4")),
+            connections_per_file=int(self.settings_overrides.get("connections", "1")),
+            rate_limit=self.custom_overrides.get("limit_rate"),
+            proxy=self.custom_overrides.get("proxy"),
+            cookies=self.custom_overrides.get("cookies") or self.settings_overrides.get("cookies"),
+            user_agent=self.custom_overrides.get("user_agent") or self.settings_overrides.get("user_agent"),
+            ffmpeg_location=self.ffmpeg_location,
+            playlist_title=playlist_title,
+            stream_merge=self.settings_overrides.get("stream_merge") == "1",
+        )
+        return build_ydl_opts(options)
 
     def _start_download(self) -> None:
         url = self.url_edit.text().strip()
         if not url or not self.last_info:
             QMessageBox.warning(self, "No Video", "Please analyze a video first.")
             return
+        if is_playlist_info(self.last_info):
+            self._start_playlist_download()
+            return
         
         ydl_opts = self._build_ydl_opts()
-        self.progress.setFormat("Starting download…")
-        self._run_worker(url, ydl_opts)
+        item = DownloadItem(
+            url=url,
+            title=self.last_info.get("title", "Unknown"),
+            uploader=self.last_info.get("uploader", "Unknown"),
+            duration=self.last_info.get("duration"),
+            thumbnail_url=self._get_thumbnail_url(),
+            selected_format=self.selected_format,
+            output_path=ydl_opts.get("outtmpl", {}).get("default", ""),
+            options=ydl_opts,
+            status=DownloadStatus.PENDING,
+            added_at=datetime.now(),
+            archive_key=archive_key_for_info(self.last_info),
+            # Goes ahead of queued playlists and may use the interactive slot
+            priority=PRIORITY_HIGH,
+        )
+        # The analyzed info lets the download skip a second extraction
+        self._enqueue_download(item, self.last_info)
 
-    def _run_worker(self, url: str, ydl_opts: Dict[str, Any]) -> None:
-        if self.worker_thread is not None and self.worker_thread.isRunning():
-            QMessageBox.warning(self, "In Progress", "A download is already running.")
+    def _start_playlist_download(self) -> None:
+        info = self.last_info or {}
+        entries = list_playlist_entries(info)
+        if not entries:
             return
-            
-        self.download_btn.setLoading(True)
-        self._update_ui_state(is_analyzing=True)
-        self.worker_thread = YtDlWorker(url, ydl_opts)
-        self.worker_thread.progress.connect(self._on_progress)
-        self.worker_thread.error.connect(self._on_error)
-        self.worker_thread.done.connect(self._on_done)
-        self.worker_thread.start()
-
-    def _on_progress(self, pct: int, speed: str, eta: str) -> None:
-        self.progress.setValue(pct)
-        if pct == 100:
-            self.progress.setFormat("Processing...")
-        else:
-            self.progress.setFormat(f"{pct}% ({speed}) ETA {eta}")
 
-    def _on_error(self, message: str) -> None:
-        self.download_btn.setLoading(False)
-        self._update_ui_state(has_info=True)
-        self.progress.setValue(0)
-        self.progress.setFormat("Error")
-        QMessageBox.critical(self, "Download error", message)
-        self.worker_thread = None
+        # Skip videos that a previous run already downloaded
+        keys = [archive_key(entry.get("ie_key"), entry.get("id")) or archive_key_for_url(entry["url"]) for entry in entries]
+        archived = self.queue_manager.archive.archived(keys)
+        entries = [(entry, key) for entry, key in zip(entries, keys) if key not in archived]
+        skipped = len(keys) - len(entries)
+        if not entries:
+            QMessageBox.information(self, "Nothing To Download", f"All {skipped} videos were already downloaded.")
+            return
 
-    def _on_done(self, ok: bool, message: str) -> None:
-        self.download_btn.setLoading(False)
-        self._update_ui_state(has_info=True)
-        self.progress.setValue(100 if ok else 0)
-        self.progress.setFormat("Done!" if ok else "Failed")
-        
-        # Save to history
-        if self.last_info:
-            url = self.url_edit.text().strip()
-            ydl_opts = self._build_ydl_opts()
-            status = DownloadStatus.COMPLETED if ok else DownloadStatus.FAILED
-            
-            item = DownloadItem(
-                url=url, 
-                title=self.last_info.get("title", "Unknown"),
-                uploader=self.last_info.get("uploader", "Unknown"),
-                duration=self.last_info.get("duration"),
-                thumbnail_url=self._get_thumbnail_url(),
+        # Entries of one playlist share a folder instead of one folder per title
+        playlist_title = info.get("title") or "Playlist"
+        ydl_opts = self._build_ydl_opts(playlist_title)
+
+        batch_id = uuid.uuid4().hex
+        items = [
+            DownloadItem(
+                url=entry["url"],
+                title=entry["title"],
+                uploader=entry.get("uploader") or "Unknown",
+                duration=entry.get("duration"),
+                thumbnail_url=entry.get("thumbnail"),
                 selected_format=self.selected_format,
-                output_path=ydl_opts.get("outtmpl", {}).get("default", ""),
-                options=ydl_opts, 
-                status=status,
+                output_path=ydl_opts["outtmpl"]["default"],
+                options=ydl_opts,
+                status=DownloadStatus.PENDING,
                 added_at=datetime.now(),
-                completed_at=datetime.now(),
-                error_message=message if not ok else None
+                batch_id=batch_id,
+                batch_title=playlist_title,
+                archive_key=key,
             )
-            self.queue_manager.add_to_history(item)
-        
+            for entry, key in entries
+        ]
+        self.scheduler.submit_many(items)
+        queued = sum(1 for item in items if item.id in self.queue_manager.queue)
+        message = f"Queued {queued} videos from {playlist_title}"
+        if skipped:
+            message += f" ({skipped} already downloaded)"
+        if queued < len(items):
+            message += f" ({len(items) - queued} already in the queue)"
+        self.statusBar().showMessage(message, 4000)
+        self._refresh_download_state()
+
+    def _on_batch_progress(self, batch_id: str, finished: int, total: int, percent: int) -> None:
+        title = self.scheduler.batch_title(batch_id) or "Playlist"
+        self.progress.setValue(percent)
+        self.progress.setFormat(f"{title}: {finished}/{total} videos • {percent}%")
+
+    def _enqueue_download(self, item: DownloadItem, info: Optional[Dict[str, Any]] = None) -> None:
+        self.scheduler.submit(item, info)
+        if item.status == DownloadStatus.PENDING and item.id in self.queue_manager.queue:
+            self.statusBar().showMessage(f"Queued: {item.title}", 3000)
+        self._refresh_download_state()
+
+    def _refresh_download_state(self) -> None:
+        # The download button stays usable so more items can be queued while others run
+        busy = self.scheduler.active_count() + self.scheduler.processing_count() + self.scheduler.pending_count()
+        self.download_btn.setText(f"Download ({busy})" if busy else "Download")
+        self.cancel_btn.setEnabled(busy > 0)
+
+    def _cancel_downloads(self) -> None:
+        active = self.scheduler.active_count() + self.scheduler.processing_count()
+        queued = self.scheduler.pending_count()
+        if not active and not queued:
+            return
+        reply = QMessageBox.question(
+            self, "Cancel Downloads",
+            f"Cancel {active} running and {queued} queued downloads?",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if reply == QMessageBox.Yes:
+            self.scheduler.cancel_all()
+            self.progress.setFormat("Cancelling...")
+
+    def _on_item_started(self, item: DownloadItem) -> None:
+        self._item_progress[item.id] = 0
+        if self.scheduler.active_count() == 1:
+            self.progress.setValue(0)
+            self.progress.setFormat("Starting download…")
+
+    def _on_item_resumed(self, item: DownloadItem, nbytes: int) -> None:
+        self.statusBar().showMessage(f"Resuming {item.title} ({self._format_size(nbytes)} already downloaded)", 4000)
+
+    def _on_progress(self, item: DownloadItem, progress: DownloadProgress) -> None:
+        pct = progress.percent
+        self._item_progress[item.id] = pct
+        if item.batch_id:
+            return  # Playlist entries are summarised by _on_batch_progress
+        active = self.scheduler.active_count()
+        if active <= 1:
+            self.progress.setValue(pct)
+            if progress.phase == "processing":
+                self.progress.setFormat("Processing...")
+            elif progress.phase == "downloading":
+                self.progress.setFormat(f"{pct}% ({progress.speed_text()}) ETA {progress.eta_text()}")
+            return
+
+        overall = sum(self._item_progress.values()) // max(1, len(self._item_progress))
+        queued = self.scheduler.pending_count()
+        processing = self.scheduler.processing_count()
+        self.progress.setValue(overall)
+        status = f"{active} downloads • {overall}%"
+        if processing:
+            status += f" • {processing} processing"
+        self.progress.setFormat(f"{status} • {queued} queued")
+
+    def _on_item_retrying(self, item: DownloadItem, attempt: int, delay: float) -> None:
+        self._item_progress.pop(item.id, None)
+        self.statusBar().showMessage(
+            f"{item.error_message} — retrying {item.title} in {int(delay)}s (attempt {attempt + 1})", 6000
+        )
+        self._refresh_download_state()
+
+    def _on_item_duplicate(self, item: DownloadItem) -> None:
+        self.statusBar().showMessage(f"Already in the queue: {item.title}", 4000)
+
+    def _on_item_deferred(self, item: DownloadItem, missing: int) -> None:
+        self.statusBar().showMessage(
+            f"Not enough disk space for {item.title}: {self._format_size(missing)} more needed; it waits in the queue", 10000
+        )
+
+    def _on_item_finished(self, item: DownloadItem, ok: bool, message: str) -> None:
+        self._item_progress.pop(item.id, None)
+        if item.status == DownloadStatus.CANCELLED:
+            self._session_results["cancelled"] += 1
+        else:
+            self._session_results["ok" if ok else "failed"] += 1
+
         if ok:
-            QMessageBox.information(self, "Download Complete", message)
+            self.statusBar().showMessage(f"Finished: {item.title}", 4000)
+        elif item.status == DownloadStatus.CANCELLED:
+            self.statusBar().showMessage(f"Cancelled: {item.title}", 4000)
+        else:
+            self.statusBar().showMessage(f"Failed: {item.title} ({message})", 6000)
+        self._refresh_download_state()
+
+        if not self.scheduler.is_idle():
+            return
+
+        # Queue drained: report once for the whole batch
+        ok_count, failed_count = self._session_results["ok"], self._session_results["failed"]
+        self._session_results = {"ok": 0, "failed": 0, "cancelled": 0}
+        if ok_count + failed_count == 0:
+            self.progress.setValue(0)
+            self.progress.setFormat("Cancelled")
+            return
+        self.progress.setValue(100 if failed_count == 0 else 0)
+        self.progress.setFormat("Done!" if failed_count == 0 else "Failed")
+        if ok_count + failed_count == 1:
+            if failed_count == 0:
+                QMessageBox.information(self, "Download Complete", "Download complete.")
+            elif item.status == DownloadStatus.FAILED:
+                QMessageBox.critical(self, "Download Failed", message)
+            else:
+                QMessageBox.critical(self, "Download Failed", "Download failed. See history for details.")
+        elif failed_count:
+            QMessageBox.warning(
+                self, "Downloads Finished",
+                f"{ok_count} downloads completed, {failed_count} failed. See history for details.",
+            )
         else:
-            QMessageBox.critical(self, "Download Failed", message)
-        self.worker_thread = None
+            QMessageBox.information(self, "Downloads Complete", f"{ok_count} downloads completed.")
 
     def _downloads_dir(self) -> str:
-        home = os.path.expanduser("~")
-        return os.path.join(home, "Downloads")
+        return default_downloads_dir()
 
     def _update_option_states(self) -> None:
         has_ffmpeg = bool(self._detect_ffmpeg())
@@ -573,6 +796,10 @@ class MainWindow(QMainWindow):
         dlg = DownloadSettingsDialog(self.settings_overrides, self)
         if dlg.exec():
             self.settings_overrides.update(dlg.values())
+            self.scheduler.set_max_concurrent(int(self.settings_overrides.get("max_downloads", "3")))
+            self.scheduler.set_backend(self.settings_overrides.get("backend", "thread"))
+            self.scheduler.set_batch_limit(int(self.settings_overrides.get("playlist_downloads", "0")))
+            self.scheduler.set_speed_limit(parse_rate(self.settings_overrides.get("speed_limit")))
             self.statusBar().showMessage("Download settings saved", 3000)
 
     def _update_ytdlp(self) -> None:
@@ -595,6 +822,56 @@ class MainWindow(QMainWindow):
             self.history_dialog.redownload_requested.connect(self._redownload_from_history)
         self.history_dialog.show()
     
+    def _open_bulk_analyze(self) -> None:
+        if not self.bulk_dialog:
+            self.bulk_dialog = BulkAnalyzeDialog(self.queue_manager.archive, self.metadata_cache, self)
+            self.bulk_dialog.download_requested.connect(self._download_bulk)
+        self.bulk_dialog.show()
+
+    def _download_bulk(self, summaries: List[Dict[str, Any]]) -> None:
+        """Queue the videos picked in the bulk analyze dialog as one batch, in the best quality"""
+        batch_id = uuid.uuid4().hex
+        batch_title = f"Bulk list ({len(summaries)})"
+        ydl_opts = self._build_ydl_opts(use_selected_format=False)
+        items = []
+        skipped = 0
+        for summary in summaries:
+            entries = summary.get("entries")
+            if entries is None:
+                videos, options = [(summary, summary.get("archive_key"))], ydl_opts
+            else:
+                # Entries of a listed playlist share a folder and skip archived videos, as in playlist mode
+                keys = [archive_key(entry.get("ie_key"), entry.get("id")) or archive_key_for_url(entry["url"]) for entry in entries]
+                archived = self.queue_manager.archive.archived(keys)
+                videos = [(entry, key) for entry, key in zip(entries, keys) if key not in archived]
+                skipped += len(keys) - len(videos)
+                options = self._build_ydl_opts(summary["title"], use_selected_format=False)
+            for video, key in videos:
+                items.append(DownloadItem(
+                    url=video["url"],
+                    title=video.get("title") or video["url"],
+                    uploader=video.get("uploader") or "Unknown",
+                    duration=video.get("duration"),
+                    thumbnail_url=video.get("thumbnail"),
+                    selected_format=None,
+                    output_path=options["outtmpl"]["default"],
+                    options=options,
+                    status=DownloadStatus.PENDING,
+                    added_at=datetime.now(),
+                    batch_id=batch_id,
+                    batch_title=batch_title,
+                    archive_key=key,
+                ))
+        self.scheduler.submit_many(items)
+        queued = sum(1 for item in items if item.id in self.queue_manager.queue)
+        message = f"Queued {queued} videos from the bulk list"
+        if skipped:
+            message += f" ({skipped} already downloaded)"
+        if queued < len(items):
+            message += f" ({len(items) - queued} already in the queue)"
+        self.statusBar().showMessage(message, 4000)
+        self._refresh_download_state()
+
     def _redownload_from_history(self, item: DownloadItem) -> None:
         """Re-download a video from history"""
         # Set the URL and analyze
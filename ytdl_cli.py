@@ -0,0 +1,307 @@
+"""Headless batch downloads: ``python -m ytdl_cli URL [URL ...] [-a urls.txt]``
+
+Uses the same option building, queue, archive and download engine as the
+window, and never imports PySide6, so it runs on machines without a display.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from bandwidth_governor import default_governor, parse_rate
+from batch_runner import BatchRunner
+from download_archive import archive_key, archive_key_for_url
+from download_options import (
+    AUDIO_FORMATS, DEFAULT_AUDIO_FORMAT, DownloadOptions, SPONSORBLOCK_DEFAULT_CATEGORIES, build_ydl_opts,
+    default_downloads_dir,
+)
+from download_progress import DownloadProgress, format_bytes
+from file_integrity import verify_file
+from media_info import is_playlist_info, list_playlist_entries, probe_url_metadata
+from queue_manager import PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL, QueueManager, DownloadItem, DownloadStatus, video_keys
+
+
+# Kept apart from the window's data directory so both can run at the same time
+DEFAULT_DATA_DIR = os.path.join(os.path.expanduser("~/.ytdownloader"), "cli")
+PRIORITIES = {"low": PRIORITY_LOW, "normal": PRIORITY_NORMAL, "high": PRIORITY_HIGH}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m ytdl_cli",
+        description="Download videos in parallel without the graphical interface.",
+    )
+    parser.add_argument("urls", nargs="*", metavar="URL", help="video, playlist or channel URLs")
+    parser.add_argument("-a", "--batch-file", action="append", default=[], metavar="FILE",
+                        help="file with one URL per line ('#' starts a comment, '-' reads stdin)")
+    parser.add_argument("-o", "--output", metavar="DIR", help="output directory (default: ~/Downloads)")
+    parser.add_argument("-f", "--format", metavar="FORMAT", help="yt-dlp format selector")
+    parser.add_argument("-x", "--audio", action="store_true", help="download only the audio")
+    parser.add_argument("--audio-format", choices=list(AUDIO_FORMATS), default=DEFAULT_AUDIO_FORMAT,
+                        help="audio output with -x; only mp3 always re-encodes (default: %(default)s, the original codec)")
+    parser.add_argument("-j", "--parallel", type=int, default=3, metavar="N", help="videos downloaded at once (default: 3)")
+    parser.add_argument("--fragments", type=int, default=4, metavar="N",
+                        help="concurrent fragments per video, 0 to tune per site (default: 4)")
+    parser.add_argument("-N", "--connections", type=int, default=1, metavar="N",
+                        help="connections per file for single-file (non-fragmented) formats (default: 1)")
+    parser.add_argument("--limit-rate", metavar="RATE", help="speed limit per download, e.g. 2M")
+    parser.add_argument("--total-rate", metavar="RATE", help="speed limit shared by all downloads, e.g. 10M")
+    parser.add_argument("--subs", metavar="LANGS", help="comma-separated subtitle languages to download")
+    parser.add_argument("--embed-subs", action="store_true", help="embed the downloaded subtitles")
+    parser.add_argument("--thumbnail", action="store_true", help="save the thumbnail")
+    parser.add_argument("--description", action="store_true", help="save the description")
+    parser.add_argument("--sponsorblock", nargs="?", const=",".join(SPONSORBLOCK_DEFAULT_CATEGORIES), metavar="CATS",
+                        help="remove SponsorBlock segments (optionally comma-separated categories)")
+    parser.add_argument("--proxy", metavar="URL")
+    parser.add_argument("--cookies", metavar="FILE", help="Netscape cookies file")
+    parser.add_argument("--user-agent", metavar="UA")
+    parser.add_argument("--ffmpeg-location", metavar="PATH")
+    parser.add_argument("--stream-merge", action="store_true",
+                        help="mux separate video and audio with one ffmpeg while downloading, without intermediate files")
+    parser.add_argument("--playlist", action="store_true",
+                        help="expand playlists and channels so their videos download in parallel")
+    parser.add_argument("--force", action="store_true", help="download videos that are already in the archive")
+    parser.add_argument("--priority", choices=sorted(PRIORITIES), default="normal",
+                        help="order against downloads still queued from earlier runs (default: normal)")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, metavar="DIR",
+                        help="queue, history and archive location (default: %(default)s)")
+    parser.add_argument("--verify", action="store_true",
+                        help="check finished downloads in the history against their checksums, then exit")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only print failures and the summary")
+    return parser
+
+
+def read_urls(args: argparse.Namespace) -> List[str]:
+    urls = list(args.urls)
+    for path in args.batch_file:
+        handle = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+        with handle:
+            for line in handle:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    urls.append(line)
+    # Keep the first occurrence of each URL, in order
+    return list(dict.fromkeys(urls))
+
+
+def options_from_args(args: argparse.Namespace) -> DownloadOptions:
+    return DownloadOptions(
+        output_dir=args.output or default_downloads_dir(),
+        format=args.format,
+        audio_only=args.audio,
+        audio_format=args.audio_format,
+        subtitles=[lang.strip() for lang in (args.subs or "").split(",") if lang.strip()],
+        embed_subtitles=args.embed_subs,
+        save_thumbnail=args.thumbnail,
+        save_description=args.description,
+        sponsorblock=bool(args.sponsorblock),
+        sponsorblock_categories=[c.strip() for c in (args.sponsorblock or "").split(",") if c.strip()] or None,
+        concurrent_fragments=max(0, args.fragments),
+        connections_per_file=max(1, args.connections),
+        rate_limit=args.limit_rate,
+        proxy=args.proxy,
+        cookies=args.cookies,
+        user_agent=args.user_agent,
+        ffmpeg_location=args.ffmpeg_location,
+        stream_merge=args.stream_merge,
+    )
+
+
+def new_item(url: str, ydl_opts: Dict[str, Any], entry: Optional[Dict[str, Any]] = None, **fields: Any) -> DownloadItem:
+    entry = entry or {}
+    return DownloadItem(
+        url=url,
+        title=entry.get("title") or url,
+        uploader=entry.get("uploader") or "Unknown",
+        duration=entry.get("duration"),
+        thumbnail_url=entry.get("thumbnail"),
+        selected_format=ydl_opts.get("format"),
+        output_path=ydl_opts["outtmpl"]["default"],
+        options=ydl_opts,
+        status=DownloadStatus.PENDING,
+        added_at=datetime.now(),
+        **fields,
+    )
+
+
+def plan_items(urls: List[str], options: DownloadOptions, queue_manager: QueueManager, log,
+               expand_playlists: bool = False, force: bool = False,
+               priority: int = PRIORITY_NORMAL) -> List[DownloadItem]:
+    """Turn URLs into queue items, expanding playlists and skipping archived videos unless ``force``.
+
+    Videos already in the work queue are always skipped.
+    """
+    archive = queue_manager.archive
+    items: List[DownloadItem] = []
+    for url in urls:
+        if not force and archive_key_for_url(url) in archive:
+            log(f"[skip] {url}: already downloaded")
+            continue
+
+        info = probe_url_metadata(url, playlist=True) if expand_playlists else None
+        if not info or not is_playlist_info(info):
+            ydl_opts = build_ydl_opts(options)
+            items.append(new_item(url, ydl_opts, archive_key=archive_key_for_url(url), priority=priority))
+            continue
+
+        playlist_title = info.get("title") or "Playlist"
+        ydl_opts = build_ydl_opts(DownloadOptions(**{**vars(options), "playlist_title": playlist_title}))
+        entries = list_playlist_entries(info)
+        keys = [archive_key(e.get("ie_key"), e.get("id")) or archive_key_for_url(e["url"]) for e in entries]
+        archived = set() if force else archive.archived(keys)
+        batch_id = uuid.uuid4().hex
+        queued = 0
+        for entry, key in zip(entries, keys):
+            if key in archived:
+                continue
+            items.append(new_item(
+                entry["url"], ydl_opts, entry,
+                batch_id=batch_id, batch_title=playlist_title, archive_key=key, priority=priority,
+            ))
+            queued += 1
+        log(f"[playlist] {playlist_title}: {queued} videos queued, {len(entries) - queued} already downloaded")
+
+    # Another job for a queued video would write into the same .part file
+    live = queue_manager.queued_keys()
+    planned = []
+    for item in items:
+        keys = video_keys(item)
+        if any(key in live for key in keys):
+            log(f"[skip] {item.url}: already queued")
+        else:
+            live.update(keys)
+            planned.append(item)
+    return planned
+
+
+class ConsoleReporter:
+    """Prints one line per item event and, on a terminal, a live status line."""
+
+    def __init__(self, quiet: bool = False, stream=sys.stderr) -> None:
+        self._quiet = quiet
+        self._stream = stream
+        self._live = stream.isatty() and not quiet
+        self._progress: Dict[str, DownloadProgress] = {}
+        self._last_status = 0.0
+        self.results = {"ok": 0, "failed": 0, "cancelled": 0}
+
+    def print_line(self, text: str) -> None:
+        if self._live:
+            self._stream.write("\r\033[K")
+        self._stream.write(text + "\n")
+        self._stream.flush()
+
+    def __call__(self, kind: str, item: DownloadItem, data: Any) -> None:
+        if kind == "progress":
+            if item.title == item.url and data.filename:
+                item.title = os.path.splitext(os.path.basename(data.filename))[0]
+            self._progress[item.id] = data
+            self._status_line()
+            return
+        if kind == "started":
+            self._progress.pop(item.id, None)
+            if not self._quiet:
+                self.print_line(f"[start] {item.title}")
+        elif kind == "resumed" and not self._quiet:
+            self.print_line(f"[resume] {item.title}: {format_bytes(data)} already downloaded")
+        elif kind == "duplicate":
+            self.print_line(f"[skip] {item.url}: already queued")
+        elif kind == "deferred":
+            self.print_line(f"[waiting] {item.title}: {format_bytes(data)} more disk space needed")
+        elif kind == "retrying":
+            self._progress.pop(item.id, None)
+            self.print_line(f"[retry] {item.title}: {item.error_message}; next attempt in {int(data)}s")
+        elif kind == "finished":
+            self._progress.pop(item.id, None)
+            ok, message = data
+            if item.status == DownloadStatus.CANCELLED:
+                self.results["cancelled"] += 1
+                self.print_line(f"[cancelled] {item.title}")
+            elif ok:
+                self.results["ok"] += 1
+                if not self._quiet:
+                    self.print_line(f"[done] {item.title}")
+            else:
+                self.results["failed"] += 1
+                self.print_line(f"[failed] {item.title}: {message}")
+
+    def _status_line(self) -> None:
+        now = time.monotonic()
+        if not self._live or now - self._last_status < 0.5:
+            return
+        self._last_status = now
+        running = [p for p in self._progress.values() if p.phase == "downloading"]
+        speed = sum(p.speed or 0 for p in running)
+        percent = sum(p.percent for p in self._progress.values()) // max(1, len(self._progress))
+        self._stream.write(
+            f"\r\033[K{len(self._progress)} active • {percent}% • {format_bytes(speed)}/s"
+        )
+        self._stream.flush()
+
+
+def verify_history(queue_manager: QueueManager, log) -> int:
+    """Re-hash the finished files recorded in the history; returns how many are missing or changed"""
+    bad = 0
+    for item in queue_manager.get_history():
+        if not item.checksum or not item.file_path:
+            continue
+        try:
+            ok = verify_file(item.file_path, item.checksum)
+        except FileNotFoundError:
+            log(f"[missing] {item.file_path}")
+            bad += 1
+            continue
+        except ValueError as err:
+            log(f"[skip] {item.file_path}: {err}")
+            continue
+        if ok:
+            log(f"[ok] {item.file_path}")
+        else:
+            log(f"[changed] {item.file_path}")
+            bad += 1
+    return bad
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    urls = read_urls(args)
+    queue_manager = QueueManager(args.data_dir)
+    if args.verify:
+        return 1 if verify_history(queue_manager, lambda text: print(text, file=sys.stderr)) else 0
+    resumed = len(queue_manager.get_pending())
+    if not urls and not resumed:
+        build_parser().print_usage(sys.stderr)
+        print("error: no URLs given and nothing queued from a previous run", file=sys.stderr)
+        return 2
+
+    default_governor().set_rate(parse_rate(args.total_rate))
+    reporter = ConsoleReporter(quiet=args.quiet)
+    log = (lambda text: None) if args.quiet else reporter.print_line
+    runner = BatchRunner(queue_manager, max_concurrent=args.parallel, on_event=reporter)
+
+    if resumed:
+        log(f"Resuming {resumed} queued downloads from a previous run")
+    items = plan_items(urls, options_from_args(args), queue_manager, log,
+                       expand_playlists=args.playlist, force=args.force, priority=PRIORITIES[args.priority])
+    if items:
+        runner.submit_many(items)
+
+    try:
+        runner.run()
+    except KeyboardInterrupt:
+        left = len(queue_manager.get_queue())
+        reporter.print_line(f"Interrupted; {left} downloads stay queued and continue on the next run")
+        return 130
+
+    results = reporter.results
+    reporter.print_line(f"{results['ok']} completed, {results['failed']} failed, {results['cancelled']} cancelled")
+    return 1 if results["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
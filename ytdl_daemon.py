@@ -0,0 +1,454 @@
+"""Local HTTP/JSON service: ``python -m ytdl_daemon [--port 8731]``
+
+Lets other tools and browser pages queue downloads without the window:
+
+    POST   /api/downloads    {"url": "...", "options": {...}, "playlist": false, "force": false,
+                              "priority": "normal"}
+                             options: format, audio_only, audio_format, subtitles, embed_subtitles
+    GET    /api/queue        queued and running items with their progress
+    GET    /api/items/<id>   one item, queued or from the history
+    GET    /api/history      finished items, newest last
+    PATCH  /api/items/<id>   {"priority": "high"} moves a queued item ahead
+    DELETE /api/items/<id>   cancel a queued or running item
+
+Status requests are served from a cached, pre-encoded snapshot, so polling
+costs neither queue locks nor JSON encoding of the whole history per request.
+"""
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import hmac
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from bandwidth_governor import default_governor, parse_rate
+from batch_runner import BatchRunner
+from download_options import AUDIO_FORMATS, DownloadOptions, default_downloads_dir
+from download_progress import DownloadProgress
+from queue_manager import QueueManager, DownloadItem, DownloadStatus
+from ytdl_cli import PRIORITIES, plan_items
+
+
+DEFAULT_PORT = 8731
+# Kept apart from the window's and the command line's data so all of them can run at once
+DEFAULT_DATA_DIR = os.path.join(os.path.expanduser("~/.ytdownloader"), "daemon")
+# Upper bound on how stale a served snapshot may be while downloads are reporting progress
+SNAPSHOT_MAX_STALENESS = 0.2
+HISTORY_LIMIT = 100
+MAX_REQUEST_BODY = 1024 * 1024
+LOOPBACK_HOSTS = {"localhost", "127.0.0.1", "::1", "[::1]"}
+
+# DownloadOptions fields a client may set per download, with their accepted JSON types.
+# Paths, executables, cookies and network settings stay as the daemon was started with
+_CLIENT_OPTION_TYPES: Dict[str, Tuple[type, ...]] = {
+    "format": (str, type(None)),
+    "audio_only": (bool,),
+    "audio_format": (str,),
+    "subtitles": (list,),
+    "embed_subtitles": (bool,),
+}
+
+
+def item_status(item: DownloadItem, progress: Optional[DownloadProgress] = None) -> Dict[str, Any]:
+    """JSON view of a queue item for API clients"""
+    data = {
+        "id": item.id,
+        "url": item.url,
+        "title": item.title,
+        "uploader": item.uploader,
+        "duration": item.duration,
+        "status": item.status.value,
+        "output_path": item.output_path,
+        "batch_id": item.batch_id,
+        "batch_title": item.batch_title,
+        "added_at": item.added_at.isoformat(),
+        "started_at": item.started_at.isoformat() if item.started_at else None,
+        "completed_at": item.completed_at.isoformat() if item.completed_at else None,
+        "error": item.error_message,
+        "attempts": item.attempts,
+        "retry_at": item.retry_at,
+        "file_size": item.file_size,
+        "file_path": item.file_path,
+        "checksum": item.checksum,
+        "resumed_bytes": item.resumed_bytes,
+        "priority": item.priority,
+        "progress": None,
+    }
+    if progress is not None:
+        data["progress"] = {
+            "phase": progress.phase,
+            "percent": progress.percent,
+            "downloaded_bytes": progress.downloaded_bytes,
+            "total_bytes": progress.total_bytes,
+            "speed": progress.speed,
+            "eta": progress.eta,
+        }
+    return data
+
+
+class StatusSnapshot:
+    """Cached JSON state of the queue and history, shared by all request threads.
+
+    Updated from the runner thread through ``on_event``; each update stores a
+    fresh per-item dict, so readers never see a half-changed item. The encoded
+    queue body is rebuilt lazily by the first request after a change, and at
+    most every ``max_staleness`` seconds, however many clients poll.
+    """
+
+    def __init__(self, max_staleness: float = SNAPSHOT_MAX_STALENESS) -> None:
+        self.max_staleness = max_staleness
+        self._lock = threading.Lock()
+        self._items: Dict[str, Dict[str, Any]] = {}
+        self._progress: Dict[str, DownloadProgress] = {}
+        self._history: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._version = 0
+        self._queue_body: Tuple[int, bytes] = (-1, b"")
+        self._history_body: Tuple[int, bytes] = (-1, b"")
+        self._history_version = 0
+        self._encoded_at = 0.0
+
+    def reset(self, queue: List[DownloadItem], history: List[DownloadItem]) -> None:
+        with self._lock:
+            self._items = {item.id: item_status(item) for item in queue}
+            self._history = OrderedDict((item.id, item_status(item)) for item in history[-HISTORY_LIMIT:])
+            self._version += 1
+            self._history_version += 1
+
+    def on_event(self, kind: str, item: DownloadItem, data: Any) -> None:
+        """BatchRunner event callback"""
+        if kind in ("batch", "duplicate"):
+            return  # Playlist totals are not part of the API; duplicates never entered the queue
+        with self._lock:
+            if kind == "progress":
+                self._progress[item.id] = data
+            elif kind in ("queued", "started", "retrying"):
+                self._progress.pop(item.id, None)
+            if kind == "finished":
+                self._items.pop(item.id, None)
+                self._progress.pop(item.id, None)
+                self._history[item.id] = item_status(item)
+                self._history.move_to_end(item.id)
+                while len(self._history) > HISTORY_LIMIT:
+                    self._history.popitem(last=False)
+                self._history_version += 1
+            else:
+                self._items[item.id] = item_status(item, self._progress.get(item.id))
+            self._version += 1
+
+    def item(self, item_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._items.get(item_id) or self._history.get(item_id)
+
+    def queue_body(self) -> Tuple[int, bytes]:
+        """Encoded queue state and its version, re-encoded only when it changed"""
+        with self._lock:
+            version, body = self._queue_body
+            now = time.monotonic()
+            if version != self._version and (version < 0 or now - self._encoded_at >= self.max_staleness):
+                items = list(self._items.values())
+                counts = {status.value: 0 for status in DownloadStatus}
+                for data in items:
+                    counts[data["status"]] += 1
+                payload = {"version": self._version, "counts": counts, "items": items}
+                self._queue_body = (self._version, json.dumps(payload).encode("utf-8"))
+                self._encoded_at = now
+            return self._queue_body
+
+    def history_body(self) -> Tuple[int, bytes]:
+        with self._lock:
+            if self._history_body[0] != self._history_version:
+                payload = {"version": self._history_version, "items": list(self._history.values())}
+                self._history_body = (self._history_version, json.dumps(payload).encode("utf-8"))
+            return self._history_body
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def parse_client_options(overrides: Any) -> Dict[str, Any]:
+    """The per-download options of a request, type-checked; raises ApiError(400) otherwise"""
+    if not isinstance(overrides, dict):
+        raise ApiError(400, "\"options\" must be an object")
+    unknown = sorted(set(overrides) - set(_CLIENT_OPTION_TYPES))
+    if unknown:
+        raise ApiError(400, f"unsupported options: {', '.join(unknown)}")
+    for name, value in overrides.items():
+        if not isinstance(value, _CLIENT_OPTION_TYPES[name]):
+            raise ApiError(400, f"invalid value for \"{name}\": {value!r}")
+    if isinstance(overrides.get("format"), str) and not overrides["format"].strip():
+        raise ApiError(400, "\"format\" must not be empty")
+    if "audio_format" in overrides and overrides["audio_format"] not in AUDIO_FORMATS:
+        raise ApiError(400, f"\"audio_format\" must be one of: {', '.join(AUDIO_FORMATS)}")
+    if not all(isinstance(lang, str) and lang.strip() for lang in overrides.get("subtitles", [])):
+        raise ApiError(400, "\"subtitles\" must be a list of language codes")
+    return overrides
+
+
+def parse_priority(value: Any) -> int:
+    """Priority from a request: "low", "normal", "high" or a number (higher starts first)"""
+    if isinstance(value, str) and value.lower() in PRIORITIES:
+        return PRIORITIES[value.lower()]
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    raise ApiError(400, f"invalid priority: {value!r}")
+
+
+class DaemonServer(ThreadingHTTPServer):
+    """HTTP front end of a BatchRunner"""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        runner: BatchRunner,
+        snapshot: StatusSnapshot,
+        defaults: DownloadOptions,
+        token: Optional[str] = None,
+        allow_origins: Optional[List[str]] = None,
+        verbose: bool = False,
+    ) -> None:
+        super().__init__(address, DaemonRequestHandler)
+        self.runner = runner
+        self.snapshot = snapshot
+        self.defaults = defaults
+        self.token = token
+        self.allow_origins = set(allow_origins or [])
+        self.verbose = verbose
+
+    def enqueue(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Plan and submit the downloads described by a POST /api/downloads body"""
+        urls = request.get("urls") or ([request["url"]] if request.get("url") else [])
+        if not isinstance(urls, list) or not urls or not all(isinstance(u, str) and u.strip() for u in urls):
+            raise ApiError(400, "expected \"url\" or a non-empty \"urls\" list")
+        options = dataclasses.replace(self.defaults, **parse_client_options(request.get("options") or {}))
+        priority = parse_priority(request.get("priority", "normal"))
+
+        skipped: List[str] = []
+        items = plan_items(
+            [u.strip() for u in urls], options, self.runner.queue_manager,
+            lambda text: skipped.append(text),
+            expand_playlists=bool(request.get("playlist")), force=bool(request.get("force")), priority=priority,
+        )
+        if items:
+            self.runner.submit_many(items)
+        return {"queued": [item_status(item) for item in items], "messages": skipped}
+
+
+class DaemonRequestHandler(BaseHTTPRequestHandler):
+    server: DaemonServer
+    protocol_version = "HTTP/1.1"  # keep-alive, so pollers reuse their connection
+
+    def do_GET(self) -> None:
+        self._handle(self._get)
+
+    def do_POST(self) -> None:
+        self._handle(self._post)
+
+    def do_PATCH(self) -> None:
+        self._handle(self._patch)
+
+    def do_DELETE(self) -> None:
+        self._handle(self._delete)
+
+    def do_OPTIONS(self) -> None:
+        """CORS preflight for the origins allowed on the command line"""
+        self.send_response(204)
+        self._cors_headers()
+        self.send_header("Access-Control-Allow-Methods", "GET, POST, PATCH, DELETE, OPTIONS")
+        self.send_header("Access-Control-Allow-Headers", "Authorization, Content-Type")
+        self.send_header("Access-Control-Max-Age", "600")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    # --- Routes ---
+
+    def _get(self) -> None:
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path == "/api/queue":
+            self._send_cached(*self.server.snapshot.queue_body())
+        elif path == "/api/history":
+            self._send_cached(*self.server.snapshot.history_body())
+        elif path.startswith("/api/items/"):
+            data = self.server.snapshot.item(path[len("/api/items/"):])
+            if data is None:
+                raise ApiError(404, "unknown item")
+            self._send_json(200, data)
+        else:
+            raise ApiError(404, "not found")
+
+    def _post(self) -> None:
+        if self.path.split("?", 1)[0].rstrip("/") != "/api/downloads":
+            raise ApiError(404, "not found")
+        self._send_json(202, self.server.enqueue(self._read_json()))
+
+    def _patch(self) -> None:
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if not path.startswith("/api/items/"):
+            raise ApiError(404, "not found")
+        item_id = path[len("/api/items/"):]
+        request = self._read_json()
+        data = self.server.snapshot.item(item_id)
+        if data is None:
+            raise ApiError(404, "unknown item")
+        if data["status"] != "pending":
+            raise ApiError(409, "only queued items can be reordered")
+        if "priority" not in request:
+            raise ApiError(400, "expected \"priority\"")
+        priority = parse_priority(request["priority"])
+        self.server.runner.set_priority(item_id, priority)
+        self._send_json(202, {"id": item_id, "priority": priority})
+
+    def _read_json(self) -> Dict[str, Any]:
+        # Requiring JSON makes browsers send a CORS preflight, which other origins fail
+        if self.headers.get_content_type() != "application/json":
+            raise ApiError(415, "expected an application/json body")
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0 or length > MAX_REQUEST_BODY:
+            raise ApiError(400, "missing or oversized request body")
+        try:
+            request = json.loads(self.rfile.read(length))
+        except ValueError:
+            raise ApiError(400, "invalid JSON")
+        if not isinstance(request, dict):
+            raise ApiError(400, "expected a JSON object")
+        return request
+
+    def _delete(self) -> None:
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if not path.startswith("/api/items/"):
+            raise ApiError(404, "not found")
+        item_id = path[len("/api/items/"):]
+        data = self.server.snapshot.item(item_id)
+        if data is None:
+            raise ApiError(404, "unknown item")
+        self.server.runner.cancel(item_id)
+        self._send_json(202, {"id": item_id, "cancelling": data["status"] in ("pending", "downloading", "processing")})
+
+    # --- Plumbing ---
+
+    def _handle(self, route) -> None:
+        try:
+            self._check_access()
+            route()
+        except ApiError as exc:
+            # An unread request body would be parsed as the next request on this connection
+            self.close_connection = True
+            self._send_json(exc.status, {"error": str(exc)})
+        except Exception as exc:
+            self.close_connection = True
+            # Details go to the daemon's own log, not to clients
+            print(f"error handling {self.command} {self.path}: {exc!r}", file=sys.stderr)
+            self._send_json(500, {"error": "internal error"})
+
+    def _check_access(self) -> None:
+        # Rejects DNS-rebinding pages that reach a loopback-only daemon under a foreign host name
+        host = (self.headers.get("Host") or "").rsplit(":", 1)[0]
+        if self.server.server_address[0] in LOOPBACK_HOSTS and host not in LOOPBACK_HOSTS:
+            raise ApiError(403, "unexpected Host header")
+        if self.server.token:
+            supplied = self.headers.get("Authorization") or ""
+            if not hmac.compare_digest(supplied.encode("utf-8"), f"Bearer {self.server.token}".encode("utf-8")):
+                raise ApiError(401, "missing or wrong token")
+
+    def _cors_headers(self) -> None:
+        origin = self.headers.get("Origin")
+        if origin and origin in self.server.allow_origins:
+            self.send_header("Access-Control-Allow-Origin", origin)
+            self.send_header("Vary", "Origin")
+
+    def _send_cached(self, version: int, body: bytes) -> None:
+        etag = f'"{version}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self._cors_headers()
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self._send_body(200, body, etag)
+
+    def _send_json(self, status: int, data: Any) -> None:
+        self._send_body(status, json.dumps(data).encode("utf-8"))
+
+    def _send_body(self, status: int, body: bytes, etag: Optional[str] = None) -> None:
+        self.send_response(status)
+        self._cors_headers()
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Cache-Control", "no-cache")
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m ytdl_daemon",
+        description="Serve a local HTTP/JSON API that queues and runs downloads.",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="port to listen on (default: %(default)s)")
+    parser.add_argument("--token", default=os.environ.get("YTDL_DAEMON_TOKEN"),
+                        help="require 'Authorization: Bearer TOKEN' (default: $YTDL_DAEMON_TOKEN)")
+    parser.add_argument("--allow-origin", action="append", default=[], metavar="ORIGIN",
+                        help="web page origin allowed to call the API from a browser, e.g. http://localhost:3000")
+    parser.add_argument("-o", "--output", metavar="DIR", help="default output directory (default: ~/Downloads)")
+    parser.add_argument("-j", "--parallel", type=int, default=3, metavar="N", help="videos downloaded at once (default: 3)")
+    parser.add_argument("--total-rate", metavar="RATE", help="speed limit shared by all downloads, e.g. 10M")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, metavar="DIR",
+                        help="queue, history and archive location (default: %(default)s)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log every request")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.host not in LOOPBACK_HOSTS and not args.token:
+        print("error: listening beyond localhost requires --token", file=sys.stderr)
+        return 2
+
+    queue_manager = QueueManager(args.data_dir)
+    default_governor().set_rate(parse_rate(args.total_rate))
+    snapshot = StatusSnapshot()
+    snapshot.reset(queue_manager.get_queue(), queue_manager.get_history())
+    runner = BatchRunner(queue_manager, max_concurrent=args.parallel, on_event=snapshot.on_event)
+    defaults = DownloadOptions(output_dir=args.output or default_downloads_dir())
+    try:
+        server = DaemonServer((args.host, args.port), runner, snapshot, defaults,
+                              token=args.token, allow_origins=args.allow_origin, verbose=args.verbose)
+    except OSError as exc:
+        print(f"error: cannot listen on {args.host}:{args.port}: {exc}", file=sys.stderr)
+        return 1
+
+    threading.Thread(target=server.serve_forever, name="http", daemon=True).start()
+    signal.signal(signal.SIGTERM, lambda signum, frame: runner.stop())
+    print(f"Listening on http://{args.host}:{args.port}/api/queue", file=sys.stderr)
+    try:
+        runner.run(until_idle=False)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
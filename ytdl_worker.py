@@ -1,92 +1,110 @@
 from __future__ import annotations
 
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Optional
 
 from PySide6.QtCore import QThread, Signal
-import yt_dlp
+from yt_dlp.utils import DownloadCancelled
 import requests
 import subprocess
 import sys
 
-
-def probe_url_metadata(url: str) -> Optional[Dict[str, Any]]:
-    try:
-        with yt_dlp.YoutubeDL({"quiet": True, "skip_download": True}) as ydl:
-            return ydl.extract_info(url, download=False)
-    except Exception:
-        return None
-
-
-def list_formats(info: Dict[str, Any]) -> List[Dict[str, Any]]:
-    result: List[Dict[str, Any]] = []
-    for f in info.get("formats", []) or []:
-        result.append(
-            {
-                "format_id": f.get("format_id"),
-                "ext": f.get("ext"),
-                "width": f.get("width"),
-                "height": f.get("height"),
-                "resolution": f.get("resolution") or f"{f.get('width','?')}x{f.get('height','?')}",
-                "fps": f.get("fps"),
-                "vcodec": f.get("vcodec"),
-                "acodec": f.get("acodec"),
-                "abr": f.get("abr"),
-                "filesize": f.get("filesize"),
-                "filesize_approx": f.get("filesize_approx"),
-                "format_note": f.get("format_note"),
-            }
-        )
-    return result
+from bandwidth_governor import BandwidthGovernor
+from download_engine import DownloadJob
+from file_integrity import verify_file
+from metadata_cache import MetadataCache
+from bulk_probe import BULK_PROBE_WORKERS, BulkProbe
+from download_progress import PROGRESS_UPDATES_PER_SECOND
+# Qt-free helpers, re-exported for the window
+from media_info import probe_url_metadata, is_playlist_info, list_playlist_entries, list_formats
 
 
 class YtDlWorker(QThread):
-    progress = Signal(int, str, str)
+    progress = Signal(object)  # DownloadProgress
+    resumed = Signal(object, int)  # bytes already on disk (may exceed 32 bits), fragment index
+    transferred = Signal()  # network transfer done; post-processing follows
+    checksum = Signal(str, str)  # final file path, checksum
     error = Signal(str)
     done = Signal(bool, str)
 
-    def __init__(self, url: str, ydl_opts: Dict[str, Any]) -> None:
+    def __init__(
+        self,
+        url: str,
+        ydl_opts: Dict[str, Any],
+        progress_rate: float = PROGRESS_UPDATES_PER_SECOND,
+        governor: Optional[BandwidthGovernor] = None,
+        postprocess_slots=None,
+        info: Optional[Dict[str, Any]] = None,
+    ) -> None:
         super().__init__()
         self.url = url
         self.ydl_opts = {**ydl_opts}
+        self._job = DownloadJob(
+            url,
+            ydl_opts,
+            on_progress=self.progress.emit,
+            on_resumed=self.resumed.emit,
+            progress_rate=progress_rate,
+            governor=governor,
+            on_transferred=self.transferred.emit,
+            postprocess_slots=postprocess_slots,
+            info=info,
+            on_checksum=self.checksum.emit,
+        )
+
+    def cancel(self, cleanup: bool = True) -> None:
+        """Stop the download promptly; see DownloadJob.cancel"""
+        self._job.cancel(cleanup)
 
-    def _hook(self, status: Dict[str, Any]) -> None:
-        if status.get("status") == "downloading":
-            try:
-                pct = int(float(status.get("_percent_str", "0%").strip().strip("%")))
-            except Exception:
-                pct = 0
-            speed = status.get("_speed_str", "?")
-            eta = status.get("_eta_str", "?")
-            self.progress.emit(pct, speed, eta)
+    def is_cancelled(self) -> bool:
+        return self._job.is_cancelled()
 
     def run(self) -> None:
-        options = {
-            **self.ydl_opts,
-            "progress_hooks": [self._hook],
-            "quiet": True,
-            "noprogress": True,
-            "ignoreerrors": False,
-        }
         try:
-            with yt_dlp.YoutubeDL(options) as ydl:
-                ydl.download([self.url])
+            self._job.run()
             self.done.emit(True, "Download complete.")
+        except DownloadCancelled:
+            self.done.emit(False, "Download cancelled.")
         except Exception as exc:
             self.error.emit(str(exc))
             self.done.emit(False, "Download failed.")
 
 
+class VerifyWorker(QThread):
+    """Re-hashes a finished download and compares it with its recorded checksum"""
+
+    done = Signal(bool, str)
+
+    def __init__(self, path: str, checksum: str) -> None:
+        super().__init__()
+        self.path = path
+        self.checksum = checksum
+
+    def run(self) -> None:
+        try:
+            if verify_file(self.path, self.checksum):
+                self.done.emit(True, "The file matches the checksum recorded when it was downloaded.")
+            else:
+                self.done.emit(False, "The file has changed or is damaged since it was downloaded.")
+        except FileNotFoundError:
+            self.done.emit(False, "The file no longer exists.")
+        except Exception as exc:
+            self.done.emit(False, str(exc))
+
+
 class InfoWorker(QThread):
     info = Signal(dict)
     error = Signal(str)
 
-    def __init__(self, url: str) -> None:
+    def __init__(self, url: str, playlist: bool = False, cache: Optional[MetadataCache] = None, refresh: bool = False) -> None:
         super().__init__()
         self.url = url
+        self.playlist = playlist
+        self.cache = cache
+        self.refresh = refresh
 
     def run(self) -> None:
         try:
-            info = probe_url_metadata(self.url) or {}
+            info = probe_url_metadata(self.url, playlist=self.playlist, cache=self.cache, refresh=self.refresh) or {}
             if not info:
                 raise RuntimeError("Failed to extract video info")
             self.info.emit(info)
@@ -94,6 +112,27 @@ class InfoWorker(QThread):
             self.error.emit(str(exc))
 
 
+class BulkProbeWorker(QThread):
+    """Probes a list of URLs concurrently, reporting each one as it completes"""
+
+    result = Signal(int, object, str)  # index, summary dict (None on failure), error message
+    
+    def __init__(self, urls, cache: Optional[MetadataCache] = None, workers: int = BULK_PROBE_WORKERS) -> None:
+        super().__init__()
+        self._probe = BulkProbe(
+            urls,
+            lambda index, summary, error: self.result.emit(index, summary, error or ""),
+            workers=workers,
+            cache=cache,
+        )
+
+    def cancel(self) -> None:
+        self._probe.cancel()
+
+    def run(self) -> None:
+        self._probe.run()
+
+
 class ThumbWorker(QThread):
     ready = Signal(bytes)
     error = Signal(str)